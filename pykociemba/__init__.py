@@ -0,0 +1,2 @@
+from .cache import SolutionCache
+from .solver import CancelToken, Solution, SolveError, solve, solve_anytime, solve_async, solve_many, warm_up
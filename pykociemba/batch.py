@@ -0,0 +1,370 @@
+"""
+Lockstep IDA* over many cubes at once with numpy.
+
+BatchSearch runs the Two-Phase-Algorithm of Search for a batch of cubes in parallel slots. The search stacks of all
+slots (coordinates, automaton state and next move of every level) are numpy arrays, and every step advances each slot by
+one node: the next move of its current level is looked up, the child coordinates and pruning values of all slots are
+gathered from the tables at once, and each slot then descends, stays or backtracks. A slot whose phase1 maneuver reaches
+the H subgroup switches to phase2 for that maneuver and returns to phase1 if phase2 fails. A slot which found its
+solution, or ran out of depth or nodes, is refilled with the next cube of the input, so the batch stays full. A step
+over a nearly empty batch costs about as much as a full one, so the last few cubes are finished by Search.
+
+The moves are tried in the order of Search, which makes the solutions identical to the ones of Search.solution without
+a timeout. The interpreter overhead is paid once per step instead of once per node, so bulk jobs like generating
+datasets or verifying scrambles solve many more cubes per second and core:
+
+    for index, result in BatchSearch(size=2048).solve(cubes, 24):
+        print(index, result)
+
+numpy is imported lazily, like in tablegen.
+"""
+from builtins import range
+import logging
+
+from . import canonical
+from .coordcube import CoordCube, unpack_pruning
+from .search import Search
+
+log = logging.getLogger(__name__)
+
+N_LEVEL = 32    # levels of the stacks of a slot, more than the longest maneuver searched
+
+# modes of a slot
+FREE = 0
+PHASE1 = 1
+PHASE2 = 2
+
+
+def _next_moves(transitions):
+    """next[19 * state + i]: the first move >= i the automaton allows in state, 18 if there is none"""
+    table = [18] * (canonical.N_STATE * 19)
+    for state in range(canonical.N_STATE):
+        for i in range(17, -1, -1):
+            allowed = transitions[18 * state + i] != canonical.DEAD
+            table[19 * state + i] = i if allowed else table[19 * state + i + 1]
+    return table
+
+
+class _Tables(object):
+    """The tables of CoordCube and the move automaton as numpy arrays"""
+
+    def __init__(self):
+        import numpy as np
+
+        def flat(table):
+            return np.array(table, dtype=np.intp)
+
+        def pruning(table):
+            return np.frombuffer(bytes(unpack_pruning(table)), dtype=np.uint8).astype(np.intp)
+
+        N_SLICE1 = CoordCube.N_SLICE1
+        self.flipMove = flat(CoordCube.flipMoveFlat)
+        self.twistMove = flat(CoordCube.twistMoveFlat)
+        self.FRtoBR_Move = flat(CoordCube.FRtoBR_MoveFlat)
+        self.sliceMove = self.FRtoBR_Move.reshape(-1, 18)[::24][:N_SLICE1].ravel() // 24
+        self.URFtoDLF_Move = flat(CoordCube.URFtoDLF_MoveFlat)
+        self.URtoDF_Move = flat(CoordCube.URtoDF_MoveFlat)
+        self.URtoUL_Move = flat(CoordCube.URtoUL_MoveFlat)
+        self.UBtoDF_Move = flat(CoordCube.UBtoDF_MoveFlat)
+        self.parityMove = flat(CoordCube.parityMoveFlat)
+        self.merge = flat(CoordCube.MergeURtoULandUBtoDFFlat)
+        self.flipPrun = pruning(CoordCube.Slice_Flip_Prun)
+        self.twistPrun = pruning(CoordCube.Slice_Twist_Prun)
+        self.cornerPrun = pruning(CoordCube.Slice_URFtoDLF_Parity_Prun)
+        self.edgePrun = pruning(CoordCube.Slice_URtoDF_Parity_Prun)
+        self.next1 = flat(_next_moves(canonical.PHASE1))
+        self.next2 = flat(_next_moves(canonical.PHASE2))
+        self.state1 = flat(canonical.PHASE1)
+        self.state2 = flat(canonical.PHASE2)
+
+
+_tables = None
+
+
+def tables():
+    global _tables
+    if _tables is None:
+        _tables = _Tables()
+    return _tables
+
+
+class BatchSearch(object):
+    """Two-Phase-Algorithm for many cubes in lockstep."""
+
+    def __init__(self, size=1024, tail=96):
+        """
+        size - number of cubes searched at the same time
+        tail - once the input is used up and fewer cubes than this are left, Search finishes them one by one
+        """
+        import numpy as np
+
+        self.size = size
+        self.tail = tail
+        self.nodes = 0      # nodes expanded by the last call of solve
+        self.steps = 0      # lockstep iterations of the last call of solve
+        count = size * N_LEVEL
+        self.mode = np.zeros(size, dtype=np.intp)
+        self.level = np.zeros(size, dtype=np.intp)      # current level of the phase being searched
+        self.bound1 = np.zeros(size, dtype=np.intp)     # depthPhase1 of the IDA* iteration
+        self.bound2 = np.zeros(size, dtype=np.intp)     # total length of the phase2 IDA* iteration
+        self.start2 = np.zeros(size, dtype=np.intp)     # level of the phase2 root, the length of phase1
+        self.last2 = np.zeros(size, dtype=np.intp)      # longest total length phase2 may reach
+        self.nodeCount = np.zeros(size, dtype=np.intp)
+        self.next = np.zeros(count, dtype=np.intp)      # next move to try at each level
+        self.move = np.zeros(count, dtype=np.intp)      # move taken at each level
+        self.state = np.zeros(count, dtype=np.intp)     # automaton state of each level
+        self.flip = np.zeros(count, dtype=np.intp)
+        self.twist = np.zeros(count, dtype=np.intp)
+        self.slice = np.zeros(count, dtype=np.intp)
+        self.URFtoDLF = np.zeros(count, dtype=np.intp)
+        self.FRtoBR = np.zeros(count, dtype=np.intp)
+        self.parity = np.zeros(count, dtype=np.intp)
+        self.URtoDF = np.zeros(count, dtype=np.intp)
+        self.URtoUL = np.zeros(size, dtype=np.intp)     # of the root only, phase1 does not track them
+        self.UBtoDF = np.zeros(size, dtype=np.intp)
+
+    def solve(self, cubes, maxDepth=24, maxNodes=None, useSeparator=False):
+        """
+        Solve an iterable of facelet strings. Yields (index, result) in the order the cubes are finished, result being
+        the solution string or the error string of Search.solution. Error 8 means the cube ran out of maxNodes nodes.
+        """
+        import numpy as np
+
+        t = tables()
+        self.nodes = 0
+        self.steps = 0
+        self.mode[:] = FREE
+        slots = [None] * self.size      # (index, facelets) of the cube in each slot
+        search = Search()
+        pending = enumerate(cubes)
+        exhausted = False
+
+        while True:
+            # refill the free slots
+            if not exhausted:
+                for slot in np.flatnonzero(self.mode == FREE):
+                    for index, facelets in pending:
+                        s = search.prepare(facelets)
+                        if s != 0:
+                            yield index, "Error %s" % abs(s)
+                            continue
+                        self._load(slot, search)
+                        slots[slot] = index, facelets
+                        break
+                    else:
+                        exhausted = True
+                        break
+
+            one = np.flatnonzero(self.mode == PHASE1)
+            two = np.flatnonzero(self.mode == PHASE2)
+            if exhausted and len(one) + len(two) < self.tail:
+                # a step costs about as much as a hundred nodes of Search, so a few long searches would dominate
+                for slot in np.flatnonzero(self.mode != FREE):
+                    yield self._finish(slot, slots[slot], search, maxDepth, maxNodes, useSeparator)
+                break
+            self.steps += 1
+            finished = []   # (slot, length or negative error code)
+            if len(one):
+                self._phase1(t, one, maxDepth, finished)
+            if len(two):
+                self._phase2(t, two, finished)
+            if maxNodes is not None:
+                for slot in np.flatnonzero((self.nodeCount > maxNodes) & (self.mode != FREE)):
+                    finished.append((slot, -8))
+            for slot, length in finished:
+                if self.mode[slot] == FREE:
+                    continue    # finished twice in this step
+                self.mode[slot] = FREE
+                self.nodes += int(self.nodeCount[slot])
+                if length < 0:
+                    yield slots[slot][0], "Error %s" % -length
+                else:
+                    yield slots[slot][0], self._solution(slot, length, useSeparator)
+
+    def _finish(self, slot, cube, search, maxDepth, maxNodes, useSeparator):
+        """
+        Finish the search of slot with Search, which repeats the current IDA* iteration of phase1 and finds the same
+        solution.
+        """
+        index, facelets = cube
+        self.mode[slot] = FREE
+        nodes = int(self.nodeCount[slot])
+        search.prepare(facelets)
+        s = search.search(maxDepth, float('inf'), int(self.bound1[slot]),
+                          maxNodes=None if maxNodes is None else maxNodes - nodes)
+        self.nodes += nodes + search.nodes
+        if s < 0:
+            return index, "Error %s" % -s
+        return index, search.solutionToString(s, search.depthPhase1) if useSeparator else search.solutionToString(s)
+
+    def _load(self, slot, search):
+        """Set up slot with the root of the cube set up in search."""
+        p = slot * N_LEVEL
+        self.mode[slot] = PHASE1
+        self.level[slot] = 0
+        self.bound1[slot] = 1
+        self.nodeCount[slot] = 0
+        self.next[p] = 0
+        self.state[p] = canonical.START
+        self.flip[p] = search.flip[0]
+        self.twist[p] = search.twist[0]
+        self.slice[p] = search.slice[0]
+        self.URFtoDLF[p] = search.URFtoDLF[0]
+        self.FRtoBR[p] = search.FRtoBR[0]
+        self.parity[p] = search.parity[0]
+        self.URtoUL[slot] = search.URtoUL[0]
+        self.UBtoDF[slot] = search.UBtoDF[0]
+
+    def _solution(self, slot, length, useSeparator):
+        moves = self.move[slot * N_LEVEL:slot * N_LEVEL + length]
+        s = ""
+        for i, mv in enumerate(moves):
+            s += Search.ax_to_s[mv // 3] + Search.po_to_s[mv % 3 + 1]
+            if useSeparator and i == self.start2[slot] - 1:
+                s += ". "
+        return s
+
+    def _phase1(self, t, slots, maxDepth, finished):
+        """One step of the phase1 search of the slots"""
+        import numpy as np
+
+        take = np.take
+        L = N_LEVEL
+        n = take(self.level, slots)
+        p = slots * L + n
+        mv = take(t.next1, 19 * take(self.state, p) + take(self.next, p))
+
+        # backtrack the slots without a move left at their level, or start the next IDA* iteration at the root
+        done = mv == 18
+        if done.any():
+            back = slots[done]
+            root = back[n[done] == 0]
+            self.level[back] -= 1
+            if len(root):
+                self.level[root] = 0
+                self.bound1[root] += 1
+                self.next[root * L] = 0
+                for slot in root[self.bound1[root] > maxDepth]:
+                    finished.append((slot, -7))
+            keep = ~done
+            slots = slots[keep]
+            n = n[keep]
+            p = p[keep]
+            mv = mv[keep]
+            if not len(slots):
+                return
+
+        self.next[p] = mv + 1
+        self.move[p] = mv
+        c = p + 1
+        self.state[c] = take(t.state1, 18 * take(self.state, p) + mv)
+        flip = take(t.flipMove, 18 * take(self.flip, p) + mv)
+        twist = take(t.twistMove, 18 * take(self.twist, p) + mv)
+        _slice = take(t.sliceMove, 18 * take(self.slice, p) + mv)
+        self.flip[c] = flip
+        self.twist[c] = twist
+        self.slice[c] = _slice
+        self.nodeCount[slots] += 1
+        dist = np.maximum(take(t.flipPrun, 495 * flip + _slice), take(t.twistPrun, 495 * twist + _slice))
+
+        bound = take(self.bound1, slots)
+        goal = (dist == 0) & (n >= bound - 5)   # only the last move may reach H, see Search
+        descend = ~goal & (bound - n > dist)
+        if descend.any():
+            down = slots[descend]
+            self.level[down] += 1
+            self.next[c[descend]] = 0
+        reached = goal & (n == bound - 1)
+        if reached.any():
+            self._start2(t, slots[reached], c[reached], maxDepth, finished)
+
+    def _start2(self, t, slots, c, maxDepth, finished):
+        """Set up phase2 for the slots whose phase1 maneuver reached H at the positions c"""
+        import numpy as np
+
+        # replay the phase1 maneuvers for the phase2 coordinates
+        depth = c % N_LEVEL
+        p = slots * N_LEVEL
+        URtoUL = self.URtoUL[slots]
+        UBtoDF = self.UBtoDF[slots]
+        for i in range(depth.max()):
+            mv = self.move[p]
+            self.URFtoDLF[p + 1] = t.URFtoDLF_Move[18 * self.URFtoDLF[p] + mv]
+            self.FRtoBR[p + 1] = t.FRtoBR_Move[18 * self.FRtoBR[p] + mv]
+            self.parity[p + 1] = t.parityMove[18 * self.parity[p] + mv]
+            active = depth > i      # the coordinates of shorter maneuvers are done, the stacks above them are unused
+            URtoUL = np.where(active, t.URtoUL_Move[18 * URtoUL + mv], URtoUL)
+            UBtoDF = np.where(active, t.UBtoDF_Move[18 * UBtoDF + mv], UBtoDF)
+            p += 1
+        self.URtoDF[c] = t.merge[336 * URtoUL + UBtoDF]
+        dist = np.maximum(t.cornerPrun[(24 * self.URFtoDLF[c] + self.FRtoBR[c]) * 2 + self.parity[c]],
+                          t.edgePrun[(24 * self.URtoDF[c] + self.FRtoBR[c]) * 2 + self.parity[c]])
+        last = depth + np.minimum(10, maxDepth - depth)     # at most 10 moves in phase2
+        for slot in slots[dist == 0]:
+            self.start2[slot] = self.bound1[slot]
+            finished.append((slot, self.bound1[slot]))
+        search = (dist > 0) & (depth + dist <= last)
+        if search.any():
+            slots = slots[search]
+            c = c[search]
+            self.mode[slots] = PHASE2
+            self.level[slots] = depth[search]
+            self.start2[slots] = depth[search]
+            self.bound2[slots] = depth[search] + dist[search]
+            self.last2[slots] = last[search]
+            self.next[c] = 0
+
+    def _phase2(self, t, slots, finished):
+        """One step of the phase2 search of the slots"""
+        import numpy as np
+
+        take = np.take
+        L = N_LEVEL
+        n = take(self.level, slots)
+        p = slots * L + n
+        mv = take(t.next2, 19 * take(self.state, p) + take(self.next, p))
+
+        # backtrack, start the next IDA* iteration at the root of phase2 or give up and continue phase1
+        done = mv == 18
+        if done.any():
+            back = slots[done]
+            root = back[n[done] == self.start2[back]]
+            self.level[back] -= 1
+            if len(root):
+                self.bound2[root] += 1
+                failed = self.bound2[root] > self.last2[root]
+                self.mode[root[failed]] = PHASE1
+                self.level[root[failed]] = self.start2[root[failed]] - 1
+                again = root[~failed]
+                self.level[again] = self.start2[again]
+                self.next[again * L + self.start2[again]] = 0
+            keep = ~done
+            slots = slots[keep]
+            n = n[keep]
+            p = p[keep]
+            mv = mv[keep]
+            if not len(slots):
+                return
+
+        self.next[p] = mv + 1
+        self.move[p] = mv
+        c = p + 1
+        self.state[c] = take(t.state2, 18 * take(self.state, p) + mv)
+        URFtoDLF = take(t.URFtoDLF_Move, 18 * take(self.URFtoDLF, p) + mv)
+        FRtoBR = take(t.FRtoBR_Move, 18 * take(self.FRtoBR, p) + mv)
+        parity = take(t.parityMove, 18 * take(self.parity, p) + mv)
+        URtoDF = take(t.URtoDF_Move, 18 * take(self.URtoDF, p) + mv)
+        self.URFtoDLF[c] = URFtoDLF
+        self.FRtoBR[c] = FRtoBR
+        self.parity[c] = parity
+        self.URtoDF[c] = URtoDF
+        self.nodeCount[slots] += 1
+        dist = np.maximum(take(t.cornerPrun, (24 * URFtoDLF + FRtoBR) * 2 + parity),
+                          take(t.edgePrun, (24 * URtoDF + FRtoBR) * 2 + parity))
+
+        for slot, length in zip(slots[dist == 0], n[dist == 0] + 1):
+            finished.append((slot, length))
+        descend = (dist > 0) & (self.bound2[slots] - n > dist)
+        if descend.any():
+            self.level[slots[descend]] += 1
+            self.next[c[descend]] = 0
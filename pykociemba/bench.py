@@ -0,0 +1,243 @@
+"""
+Benchmarks of the solver, run with `python -m pykociemba.bench <name>`.
+
+    layout  nodes/second of a phase1 tree walk with the nested list tables and with the flat tables
+    search  solves/second of Search on a fixed set of random cubes, --flipslice with the flipslice-twist table
+    batch   solves/second of solve_many with --workers processes
+    lockstep solves/second of batch.BatchSearch with --size slots, which needs --count well above --size
+    pruning lookups/second and resident memory of the byte, nibble and mod3 layouts of the pruning tables
+"""
+from builtins import range
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+from .coordcube import CoordCube, getPruning
+
+
+def _walk_nested(flip, twist, _slice, depth, lastAxis):
+    """Count the phase1 nodes up to depth, looking up the nested tables like the original search did."""
+    nodes = 0
+    for mv in range(18):
+        axis = mv // 3
+        if axis == lastAxis or axis + 3 == lastAxis:
+            continue
+        nodes += 1
+        newFlip = CoordCube.flipMove[flip][mv]
+        newTwist = CoordCube.twistMove[twist][mv]
+        newSlice = CoordCube.FRtoBR_Move[_slice * 24][mv] // 24
+        dist = max(
+            getPruning(CoordCube.Slice_Flip_Prun, CoordCube.N_SLICE1 * newFlip + newSlice),
+            getPruning(CoordCube.Slice_Twist_Prun, CoordCube.N_SLICE1 * newTwist + newSlice)
+        )
+        if dist < depth:
+            nodes += _walk_nested(newFlip, newTwist, newSlice, depth - 1, axis)
+    return nodes
+
+
+def _walk_flat(flip, twist, _slice, depth, lastAxis):
+    """Count the phase1 nodes up to depth with the flat tables."""
+    flipMove = CoordCube.flipMoveFlat
+    twistMove = CoordCube.twistMoveFlat
+    FRtoBR_Move = CoordCube.FRtoBR_MoveFlat
+    Slice_Flip_Prun = CoordCube.Slice_Flip_PrunTable
+    Slice_Twist_Prun = CoordCube.Slice_Twist_PrunTable
+    nodes = 0
+    for mv in range(18):
+        axis = mv // 3
+        if axis == lastAxis or axis + 3 == lastAxis:
+            continue
+        nodes += 1
+        newFlip = flipMove[18 * flip + mv]
+        newTwist = twistMove[18 * twist + mv]
+        newSlice = FRtoBR_Move[432 * _slice + mv] // 24
+        dist = max(
+            Slice_Flip_Prun[495 * newFlip + newSlice],
+            Slice_Twist_Prun[495 * newTwist + newSlice]
+        )
+        if dist < depth:
+            nodes += _walk_flat(newFlip, newTwist, newSlice, depth - 1, axis)
+    return nodes
+
+
+def _walk_mod3(flip, twist, _slice, depth, lastAxis, flipDist, twistDist):
+    """_walk_flat with the mod3 layout, recovering the distances from the ones of the parent."""
+    from .coordcube import MOD3_DELTA
+
+    flipMove = CoordCube.flipMoveFlat
+    twistMove = CoordCube.twistMoveFlat
+    FRtoBR_Move = CoordCube.FRtoBR_MoveFlat
+    Slice_Flip_Prun = CoordCube.Slice_Flip_PrunTable
+    Slice_Twist_Prun = CoordCube.Slice_Twist_PrunTable
+    nodes = 0
+    for mv in range(18):
+        axis = mv // 3
+        if axis == lastAxis or axis + 3 == lastAxis:
+            continue
+        nodes += 1
+        newFlip = flipMove[18 * flip + mv]
+        newTwist = twistMove[18 * twist + mv]
+        newSlice = FRtoBR_Move[432 * _slice + mv] // 24
+        d1 = flipDist + MOD3_DELTA[(Slice_Flip_Prun[495 * newFlip + newSlice] - flipDist) % 3]
+        d2 = twistDist + MOD3_DELTA[(Slice_Twist_Prun[495 * newTwist + newSlice] - twistDist) % 3]
+        if max(d1, d2) < depth:
+            nodes += _walk_mod3(newFlip, newTwist, newSlice, depth - 1, axis, d1, d2)
+    return nodes
+
+
+def _random_cubes(count, seed):
+    from .tools import randomCube
+
+    random.seed(seed)
+    return [randomCube() for _ in range(count)]
+
+
+def bench_layout(count, seed, depth):
+    from .facecube import FaceCube
+
+    cubes = [CoordCube(FaceCube(f).toCubieCube()) for f in _random_cubes(count, seed)]
+    for name, walk in (('nested', _walk_nested), ('flat', _walk_flat)):
+        nodes = 0
+        t = time.time()
+        for c in cubes:
+            nodes += walk(c.flip, c.twist, c.FRtoBR // 24, depth, -1)
+        elapsed = time.time() - t
+        print('%-8s %9d nodes %7.3f s %10.0f nodes/s' % (name, nodes, elapsed, nodes / elapsed))
+
+
+def bench_search(count, seed, maxDepth, flipSlice=False):
+    from .search import Search
+
+    cubes = _random_cubes(count, seed)
+    if flipSlice:
+        Search().useFlipSliceTwist()    # load the tables before timing
+    nodes = 0
+    t = time.time()
+    for f in cubes:
+        search = Search()
+        if flipSlice:
+            search.useFlipSliceTwist()
+        search.solution(f, maxDepth, 1000, False)
+        nodes += search.nodes
+    elapsed = time.time() - t
+    print('%d solves %7.3f s %7.2f solves/s %10d nodes' % (count, elapsed, count / elapsed, nodes))
+
+
+def bench_batch(count, seed, maxDepth, workers):
+    from .solver import solve_many
+
+    cubes = _random_cubes(count, seed)
+    t = time.time()
+    for _ in solve_many(cubes, workers=workers, chunk=1, ordered=False, max_depth=maxDepth):
+        pass
+    elapsed = time.time() - t
+    print('%d solves, %s workers %7.3f s %7.2f solves/s' % (count, workers or 'all', elapsed, count / elapsed))
+
+
+def bench_lockstep(count, seed, maxDepth, size):
+    from .batch import BatchSearch, tables
+
+    cubes = _random_cubes(count, seed)
+    tables()    # convert the tables before timing
+    search = BatchSearch(size)
+    t = time.time()
+    for _ in search.solve(cubes, maxDepth):
+        pass
+    elapsed = time.time() - t
+    print('%d solves, %d slots %7.3f s %7.2f solves/s %10d nodes %10.0f nodes/s %d steps' % (
+        count, size, elapsed, count / elapsed, search.nodes, search.nodes / elapsed, search.steps))
+
+
+def _resident():
+    """Resident memory of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bench_pruning_layout(count, seed, depth):
+    """Lookup throughput and memory of the pruning tables in the layout of this process"""
+    from . import coordcube
+    from .search import Search
+
+    tables = [getattr(CoordCube, name + 'Table') for name in (
+        'Slice_URFtoDLF_Parity_Prun', 'Slice_URtoDF_Parity_Prun', 'Slice_Twist_Prun', 'Slice_Flip_Prun')]
+    size = sum(len(getattr(t, 'table', t)) for t in tables)
+    random.seed(seed)
+    lookups = 0
+    elapsed = 0.0
+    for table in tables:
+        index = [random.randrange(len(table)) for _ in range(200000)]
+        t = time.time()
+        for i in index:
+            table[i]
+        elapsed += time.time() - t
+        lookups += len(index)
+
+    cubes = []
+    for f in _random_cubes(count, seed):
+        search = Search()
+        search.prepare(f)
+        cubes.append(search)
+    nodes = 0
+    t = time.time()
+    for c in cubes:
+        if isinstance(tables[3], coordcube.Mod3Table):
+            flipDist, twistDist = c.phase1Distances()
+            nodes += _walk_mod3(c.flip[0], c.twist[0], c.slice[0], depth, -1, flipDist, twistDist)
+        else:
+            nodes += _walk_flat(c.flip[0], c.twist[0], c.slice[0], depth, -1)
+    walk = time.time() - t
+    print('%-7s %10.0f lookups/s %10.0f nodes/s %9d table bytes %9d resident bytes' % (
+        coordcube.pruning_layout, lookups / elapsed, nodes / walk, size, _resident()))
+
+
+def bench_pruning(count, seed, depth):
+    """Run bench_pruning_layout for every layout in a fresh process"""
+    from .coordcube import LAYOUT_ENV_VAR, PRUNING_LAYOUTS
+
+    for layout in PRUNING_LAYOUTS:
+        env = dict(os.environ)
+        env[LAYOUT_ENV_VAR] = layout
+        subprocess.check_call([sys.executable, '-m', 'pykociemba.bench', 'pruning', '--in-process',
+                               '--count', str(count), '--seed', str(seed), '--depth', str(depth)], env=env)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pykociemba.bench')
+    parser.add_argument('name', choices=('layout', 'search', 'batch', 'lockstep', 'pruning'))
+    parser.add_argument('--count', type=int, default=10, help='number of random cubes')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--depth', type=int, default=10, help='phase1 depth of the layout walk')
+    parser.add_argument('--max-depth', type=int, default=24, help='maxDepth of the searches')
+    parser.add_argument('--workers', type=int, default=None, help='processes of the batch benchmark')
+    parser.add_argument('--size', type=int, default=1024, help='slots of the lockstep benchmark')
+    parser.add_argument('--flipslice', action='store_true', help='search with the flipslice-twist pruning table')
+    parser.add_argument('--in-process', action='store_true', help='run the pruning benchmark in the layout of '
+                        'this process only, see coordcube.LAYOUT_ENV_VAR')
+    args = parser.parse_args(argv)
+
+    if args.name == 'layout':
+        bench_layout(args.count, args.seed, args.depth)
+    elif args.name == 'search':
+        bench_search(args.count, args.seed, args.max_depth, args.flipslice)
+    elif args.name == 'batch':
+        bench_batch(args.count, args.seed, args.max_depth, args.workers)
+    elif args.name == 'lockstep':
+        bench_lockstep(args.count, args.seed, args.max_depth, args.size)
+    elif args.name == 'pruning':
+        if args.in_process:
+            bench_pruning_layout(args.count, args.seed, args.depth)
+        else:
+            bench_pruning(args.count, args.seed, args.depth)
+
+
+if __name__ == '__main__':
+    main()
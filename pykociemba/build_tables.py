@@ -0,0 +1,334 @@
+"""
+Build the tables of the solver ahead of time, run with `python -m pykociemba.build_tables [name ...]`.
+
+Importing coordcube generates missing tables one after another without a word. This command builds them, or the ones
+named, in a pool of processes in the order of their dependencies:
+
+- every table is built into a work directory, prunetables/.build by default, and the pruning tables checkpoint their
+  breadth-first search after every layer, so an interrupted build resumes where it stopped when run again
+- the progress of the searches and an estimate of the remaining time are logged
+- the finished files are verified against the SHA-256 checksums of prunetables/CHECKSUMS, and only when all of them
+  are they moved into prunetables/, one os.replace per file, so a process loading the tables never sees a partial one
+
+`--update-checksums` records the checksums of the built files instead, after a change of the table format.
+"""
+from collections import OrderedDict
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from . import flipslice, lastlayer, tablegen
+from .tablefile import cache_dir, map_table, read_table, table_path, write_table
+
+log = logging.getLogger(__name__)
+
+CHECKSUMS = os.path.join(cache_dir, 'CHECKSUMS')
+WORK_DIR = os.path.join(cache_dir, '.build')
+CHECKPOINT_SUFFIX = '.layers.npy'
+
+_progress = None    # multiprocessing.Queue of (target, depth, done, size) in the workers
+
+
+def _move_table(name, coord, n):
+    def build(directory, tables, checkpoint, progress):
+        write_table(tablegen.move_table(coord, n), table_path(name, directory))
+    return build
+
+
+def _merge_table(directory, tables, checkpoint, progress):
+    write_table(tablegen.merge_table(336), table_path('MergeURtoULandUBtoDF', directory))
+
+
+def _phase1_pruning(name, coordMove, n):
+    def build(directory, tables, checkpoint, progress):
+        table = tablegen.phase1_pruning(tables[coordMove], tables['FRtoBR_Move'], n,
+                                        checkpoint=checkpoint, progress=progress)
+        write_table(table, table_path(name, directory))
+    return build
+
+
+def _phase2_pruning(name, permMove, n):
+    def build(directory, tables, checkpoint, progress):
+        table = tablegen.phase2_pruning(tables[permMove], tables['FRtoBR_Move'], tablegen.PARITY_MOVE, n,
+                                        checkpoint=checkpoint, progress=progress)
+        write_table(table, table_path(name, directory))
+    return build
+
+
+def _flipslice(directory, tables, checkpoint, progress):
+    moveTables = tables['flipMove'], tables['twistMove'], tables['FRtoBR_Move']
+    flipslice.generate(directory, moveTables, checkpoint, progress)
+
+
+def _lastlayer(directory, tables, checkpoint, progress):
+    from .tablestore import TableStore
+
+    # Search runs on the tables built for it, which may not be installed yet
+    store = TableStore.publish(tables=tables)
+    try:
+        store.install()
+        lastlayer.generate(directory, progress=progress)
+    finally:
+        store.close()
+
+
+# target -> (table files, dependencies, build function, weight). The weight, about the number of entries, is the share
+# of the target in the progress. The flipslice and lastlayer tables are only built when they are named, the lastlayer
+# ones by Search with the tables of CoordCube. Their checksums are in CHECKSUMS as well, so they are verified like the
+# others, but the files are not distributed.
+TARGETS = OrderedDict([
+    ('twistMove', (('twistMove',), (), _move_table('twistMove', 'twist', 2187), 2187 * 18)),
+    ('flipMove', (('flipMove',), (), _move_table('flipMove', 'flip', 2048), 2048 * 18)),
+    ('FRtoBR_Move', (('FRtoBR_Move',), (), _move_table('FRtoBR_Move', 'FRtoBR', 11880), 11880 * 18)),
+    ('URFtoDLF_Move', (('URFtoDLF_Move',), (), _move_table('URFtoDLF_Move', 'URFtoDLF', 20160), 20160 * 18)),
+    ('URtoDF_Move', (('URtoDF_Move',), (), _move_table('URtoDF_Move', 'URtoDF', 20160), 20160 * 18)),
+    ('URtoUL_Move', (('URtoUL_Move',), (), _move_table('URtoUL_Move', 'URtoUL', 1320), 1320 * 18)),
+    ('UBtoDF_Move', (('UBtoDF_Move',), (), _move_table('UBtoDF_Move', 'UBtoDF', 1320), 1320 * 18)),
+    ('MergeURtoULandUBtoDF', (('MergeURtoULandUBtoDF',), (), _merge_table, 336 * 336)),
+    ('Slice_URFtoDLF_Parity_Prun', (('Slice_URFtoDLF_Parity_Prun',), ('URFtoDLF_Move', 'FRtoBR_Move'),
+                                    _phase2_pruning('Slice_URFtoDLF_Parity_Prun', 'URFtoDLF_Move', 20160),
+                                    24 * 20160 * 2)),
+    ('Slice_URtoDF_Parity_Prun', (('Slice_URtoDF_Parity_Prun',), ('URtoDF_Move', 'FRtoBR_Move'),
+                                  _phase2_pruning('Slice_URtoDF_Parity_Prun', 'URtoDF_Move', 20160),
+                                  24 * 20160 * 2)),
+    ('Slice_Twist_Prun', (('Slice_Twist_Prun',), ('twistMove', 'FRtoBR_Move'),
+                          _phase1_pruning('Slice_Twist_Prun', 'twistMove', 2187), 495 * 2187)),
+    ('Slice_Flip_Prun', (('Slice_Flip_Prun',), ('flipMove', 'FRtoBR_Move'),
+                         _phase1_pruning('Slice_Flip_Prun', 'flipMove', 2048), 495 * 2048)),
+    ('flipslice', (flipslice.TABLE_NAMES, ('flipMove', 'twistMove', 'FRtoBR_Move'), _flipslice,
+                   flipslice.N_FLIPSLICE_CLASS * flipslice.N_TWIST)),
+])
+DEFAULT_TARGETS = [name for name in TARGETS if name != 'flipslice']
+TARGETS['lastlayer'] = (lastlayer.TABLE_NAMES, tuple(DEFAULT_TARGETS), _lastlayer,
+                        lastlayer.N_VARIANT * lastlayer.MAX_NODES // 10)
+
+
+def sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def read_checksums(path=None):
+    """{file name: SHA-256} of a checksum file in the format of sha256sum, CHECKSUMS by default, empty if none"""
+    path = path or CHECKSUMS
+    checksums = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.strip() and not line.startswith('#'):
+                    digest, filename = line.split(None, 1)
+                    checksums[filename.strip().lstrip('*')] = digest
+    except (IOError, OSError):
+        log.warning('no checksums in %s, no table passes the verification, see --update-checksums', path)
+    return checksums
+
+
+def write_checksums(checksums, path=None):
+    path = path or CHECKSUMS
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w') as f:
+        for filename in sorted(checksums):
+            f.write('%s  %s\n' % (checksums[filename], filename))
+    os.replace(tmp, path)
+
+
+def verify(path, checksums):
+    """
+    None if the table file at path is valid and matches its checksum, else the reason why not. A file without a
+    checksum is not valid. With checksums None, while they are recorded, only the format is checked.
+    """
+    try:
+        map_table(path)
+    except (IOError, OSError, ValueError) as e:
+        return str(e)
+    if checksums is None:
+        return None
+    expected = checksums.get(os.path.basename(path))
+    if expected is None:
+        return 'no checksum in %s' % CHECKSUMS
+    if sha256(path) != expected:
+        return 'checksum mismatch'
+    return None
+
+
+def _init_worker(progress):
+    global _progress
+    _progress = progress
+
+
+def _build(task):
+    """Build a target into the work directory. Returns (target, seconds)."""
+    target, work, locations = task
+    files, dependencies, build, _ = TARGETS[target]
+    tables = dict((name, read_table(table_path(name, locations[name]))) for name in dependencies)
+
+    def progress(depth, done, size):
+        _progress.put((target, depth, done, size))
+
+    t = time.time()
+    build(work, tables, os.path.join(work, target + CHECKPOINT_SUFFIX), progress)
+    return target, time.time() - t
+
+
+def _duration(seconds):
+    seconds = int(seconds)
+    return '%d:%02d:%02d' % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def build_tables(targets=None, workers=None, work=WORK_DIR, force=False, update_checksums=False):
+    """
+    Build, verify and install the targets (names of TARGETS, DEFAULT_TARGETS by default) with a pool of workers
+    processes. Returns the list of targets which failed the verification, nothing is installed if there are any.
+
+    force - rebuild targets which are already installed
+    update_checksums - record the checksums of the built files instead of verifying them
+    """
+    if not tablegen.available():
+        raise RuntimeError('building the tables needs numpy')
+    targets = list(targets or DEFAULT_TARGETS)
+    for target in targets:
+        if target not in TARGETS:
+            raise ValueError('unknown table %s' % target)
+    checksums = None if update_checksums else read_checksums()
+    recorded = {}       # checksums of the built files with update_checksums
+    if not os.path.isdir(work):
+        os.makedirs(work)
+
+    def ready(target, directory):
+        return all(verify(table_path(name, directory), checksums) is None for name in TARGETS[target][0])
+
+    # the targets and their dependencies, which are built unless they are installed already
+    needed = set(targets)
+    for target in targets:
+        needed.update(TARGETS[target][1])
+    rebuild = set(targets) if force or update_checksums else set()
+    locations = {}      # directory of every table file the builds can read
+    done = set()        # targets whose files are ready
+    pending = []        # targets to build
+    install = []        # targets built in the work directory
+    for target in TARGETS:
+        if target not in needed:
+            continue
+        if target not in rebuild and ready(target, cache_dir):
+            directory = cache_dir
+            done.add(target)
+            for name in TARGETS[target][0]:
+                _remove(table_path(name, work))     # left over from a failed build
+            _remove(os.path.join(work, target + CHECKPOINT_SUFFIX))
+        else:
+            directory = work
+            install.append(target)
+            if ready(target, work):
+                log.info('%s: built before', target)
+                done.add(target)
+            else:
+                pending.append(target)
+        for name in TARGETS[target][0]:
+            locations[name] = directory
+
+    if not install:
+        log.info('all tables are installed')
+    weight = float(sum(TARGETS[t][3] for t in pending)) or 1.0
+    share = dict((t, 0.0) for t in pending)
+    progress = multiprocessing.Queue()
+    pool = multiprocessing.Pool(workers or multiprocessing.cpu_count(), initializer=_init_worker,
+                                initargs=(progress,))
+    running = {}
+    start = time.time()
+    try:
+        while pending or running:
+            for target in list(pending):
+                if all(dep in done for dep in TARGETS[target][1]):
+                    log.info('%s: building', target)
+                    running[target] = pool.apply_async(_build, ((target, work, locations),))
+                    pending.remove(target)
+            time.sleep(0.2)
+            while not progress.empty():
+                target, depth, entries, size = progress.get()
+                share[target] = float(entries) / size
+                _report(start, share, weight, '%s: depth %d, %d of %d entries' % (target, depth, entries, size))
+            for target, res in list(running.items()):
+                if res.ready():
+                    _, seconds = res.get()
+                    del running[target]
+                    done.add(target)
+                    share[target] = 1.0
+                    _report(start, share, weight, '%s: built in %.1f s' % (target, seconds))
+    finally:
+        pool.terminate()
+        pool.join()
+
+    failed = []
+    for target in install:
+        for name in TARGETS[target][0]:
+            path = table_path(name, work)
+            if update_checksums:
+                recorded[os.path.basename(path)] = sha256(path)
+                continue
+            reason = verify(path, checksums)
+            if reason is not None:
+                log.error('%s: %s', name, reason)
+                failed.append(target)
+    if failed:
+        for target in failed:
+            _remove(os.path.join(work, target + CHECKPOINT_SUFFIX))     # start over next time
+        log.error('nothing installed')
+        return failed
+    if update_checksums:
+        old = read_checksums()
+        old.update(recorded)
+        write_checksums(old)
+        log.info('updated %s', CHECKSUMS)
+
+    for target in install:
+        for name in TARGETS[target][0]:
+            os.replace(table_path(name, work), table_path(name))
+        _remove(os.path.join(work, target + CHECKPOINT_SUFFIX))
+        log.info('%s: installed', target)
+    try:
+        os.rmdir(work)
+    except OSError:
+        pass
+    return failed
+
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _report(start, share, weight, message):
+    fraction = sum(TARGETS[t][3] * s for t, s in share.items()) / weight
+    elapsed = time.time() - start
+    eta = elapsed * (1 - fraction) / fraction if fraction else 0
+    log.info('%5.1f%% elapsed %s eta %s  %s', 100 * fraction, _duration(elapsed), _duration(eta), message)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pykociemba.build_tables')
+    parser.add_argument('targets', nargs='*', metavar='name',
+                        help='tables to build: %s; all but flipslice and lastlayer by default' % ', '.join(TARGETS))
+    parser.add_argument('--workers', type=int, default=None, help='processes, all cores by default')
+    parser.add_argument('--work-dir', default=WORK_DIR, help='directory of the tables and checkpoints in progress')
+    parser.add_argument('--force', action='store_true', help='rebuild tables which are already installed')
+    parser.add_argument('--update-checksums', action='store_true',
+                        help='record the checksums of the built tables in %s instead of verifying them' % CHECKSUMS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    try:
+        failed = build_tables(args.targets, args.workers, args.work_dir, args.force, args.update_checksums)
+    except (RuntimeError, ValueError) as e:
+        parser.error(str(e))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Cache of solutions in front of solve().
+
+A SolutionCache keeps the most recently used solutions in memory and optionally all of them, up to a limit, in a
+SQLite database, so scrambles which come up again are not solved again, also across processes and restarts:
+
+    cache = SolutionCache(size=10000, path='solutions.sqlite')
+    pykociemba.solve(facelets, cache=cache)
+
+Solutions are keyed by the facelet string and the parameters of the solve which change the result (max_depth and
+endgame).
+Errors are not cached. With symmetric=True the key is the representative of the cube under the 48 symmetries of the
+cube and inversion, so rotated, mirrored and inverted scrambles share one entry; the representative is solved and its
+solution is mapped back to the cube.
+"""
+from collections import OrderedDict
+import sqlite3
+import threading
+
+
+class SolutionCache(object):
+    """LRU cache of (moves, phase1) by facelets, max_depth and endgame, with an optional SQLite store behind it."""
+
+    def __init__(self, size=10000, path=None, disk_size=1000000, symmetric=False):
+        """
+        size - number of solutions kept in memory
+        path - file of the SQLite store, None for a memory only cache
+        disk_size - number of solutions kept in the store, the least recently used ones are deleted beyond it
+        symmetric - key the solutions by the symmetry class of the cube
+        """
+        self.size = size
+        self.disk_size = disk_size
+        self.symmetric = symmetric
+        self.memory = OrderedDict()
+        self.hits = 0           # found in memory
+        self.disk_hits = 0      # found in the store
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS solutions '
+                            '(key TEXT PRIMARY KEY, moves TEXT, phase1 INTEGER, used INTEGER)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used)')
+            self.db.commit()
+
+    @staticmethod
+    def key(facelets, max_depth, endgame=None):
+        if endgame:
+            return '%s/%d/%d' % (facelets, max_depth, endgame)
+        return '%s/%d' % (facelets, max_depth)
+
+    def canonical(self, facelets):
+        """
+        The facelets to look up and solve instead of facelets, and a function (moves, phase1) -> (moves, phase1) which
+        maps their solution back, None if there is nothing to map.
+        """
+        if not self.symmetric:
+            return facelets, None
+        from .facecube import FaceCube
+        from .symmetry import map_names
+
+        try:
+            cc = FaceCube(facelets).toCubieCube()
+        except Exception:
+            return facelets, None
+        if cc.verify() != 0:
+            return facelets, None   # solve reports the error
+        c, table, inverted = cc.canonical()
+
+        def transform(moves, phase1):
+            return map_names(moves, table, inverted), len(moves) - phase1 if inverted else phase1
+
+        return c.toFaceCube().to_String(), transform
+
+    def get(self, facelets, max_depth, endgame=None):
+        """(moves, phase1) of the cached solution or None. The moves are a list of its own."""
+        key = self.key(facelets, max_depth, endgame)
+        with self.lock:
+            value = self.memory.pop(key, None)
+            if value is not None:
+                self.memory[key] = value
+                self.hits += 1
+                return list(value[0]), value[1]
+            if self.db is not None:
+                row = self.db.execute('SELECT moves, phase1 FROM solutions WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    # the access counter is taken from the store, which other processes write as well
+                    self.db.execute('UPDATE solutions SET used = (SELECT MAX(used) FROM solutions) + 1 WHERE key = ?',
+                                    (key,))
+                    self.db.commit()
+                    value = (row[0].split(), row[1])
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return list(value[0]), value[1]
+            self.misses += 1
+            return None
+
+    def put(self, facelets, max_depth, moves, phase1, endgame=None):
+        """Cache the solution moves (list of moves, copied) with phase1 moves in phase1."""
+        key = self.key(facelets, max_depth, endgame)
+        value = (list(moves), phase1)
+        with self.lock:
+            self._remember(key, value)
+            if self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO solutions VALUES '
+                                '(?, ?, ?, (SELECT COALESCE(MAX(used), 0) + 1 FROM solutions))',
+                                (key, ' '.join(moves), phase1))
+                self.db.execute('DELETE FROM solutions WHERE used <= (SELECT MAX(used) FROM solutions) - ?',
+                                (self.disk_size,))
+                self.db.commit()
+
+    def _remember(self, key, value):
+        self.memory.pop(key, None)
+        self.memory[key] = value
+        while len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return float(self.hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def __len__(self):
+        """Number of solutions in the cache, in the store if there is one"""
+        with self.lock:
+            if self.db is not None:
+                return self.db.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+            return len(self.memory)
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.db is not None:
+                self.db.execute('DELETE FROM solutions')
+                self.db.commit()
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return '<SolutionCache %d hits, %d disk hits, %d misses>' % (self.hits, self.disk_hits, self.misses)
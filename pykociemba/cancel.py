@@ -0,0 +1,21 @@
+"""
+Cancellation of searches. Kept apart from search, which loads the tables, and from solver, which builds on search.
+"""
+
+
+class CancelToken(object):
+    """
+    Cancellation of a search from another task or thread. The token is polled by the search as its `cancelled`
+    function, which stops with error code 9 after cancel().
+    """
+
+    __slots__ = ('requested',)
+
+    def __init__(self):
+        self.requested = False
+
+    def cancel(self):
+        self.requested = True
+
+    def __call__(self):
+        return self.requested
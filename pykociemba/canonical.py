@@ -0,0 +1,50 @@
+"""
+Finite-state automaton of the canonical maneuvers.
+
+Two moves on the same face combine to one move or cancel each other, and moves on opposite faces commute, so the
+search only needs one order of them. A maneuver is canonical if no move turns the face of the previous move and no move
+of the U, R or F face directly follows a move of the opposite face. These are all the redundancies between neighbouring
+moves, moves of other faces do not commute.
+
+The state of the automaton is the axis of the last move (0 to 5, U R F D L B), or START before the first move. The
+transition tables hold the next state for every state and move 3 * axis + power - 1 at 18 * state + move, or DEAD if
+the move makes the maneuver redundant, so the searches check and advance the automaton with a single lookup. Phase 2
+starts in the state of the last phase 1 move and uses PHASE2, which also rejects the moves outside of U, D, R2, F2, L2
+and B2.
+"""
+from builtins import range
+
+from .tablegen import PHASE2_MOVES
+
+START = 6
+DEAD = -1
+N_STATE = 7
+
+
+def transitions(moves):
+    """Transition table [N_STATE * 18] of the canonical maneuvers of the moves"""
+    table = [DEAD] * (N_STATE * 18)
+    for state in range(N_STATE):
+        for mv in moves:
+            axis = mv // 3
+            if state == START or (axis != state and axis != state - 3):
+                table[18 * state + mv] = axis
+    return table
+
+
+PHASE1 = transitions(range(18))
+PHASE2 = transitions(PHASE2_MOVES)
+
+# first axis with a move allowed in every state, the moves of U and R are phase2 moves
+FIRST_AXIS = [min(PHASE2[18 * state + mv] for mv in PHASE2_MOVES if PHASE2[18 * state + mv] != DEAD)
+              for state in range(N_STATE)]
+
+
+def state_of(moves, table=PHASE1):
+    """State of the automaton after the moves, DEAD if they are not canonical"""
+    state = START
+    for mv in moves:
+        state = table[18 * state + mv]
+        if state == DEAD:
+            break
+    return state
@@ -1,4 +1,5 @@
 from builtins import range
+import array
 import logging
 import os.path
 
@@ -7,11 +8,37 @@ try:
 except ImportError:
     import pickle as cPickle
 
+from . import tablegen, tablestore
 from .cubiecube import CubieCube, moveCube, getURtoDF
+from .tablefile import as_rows, cache_dir, flatten, map_table, table_path, typecode_for, write_table
 
 log = logging.getLogger(__name__)
 
-cache_dir = os.path.join(os.path.dirname(__file__), 'prunetables')
+# flat views of the tables loaded from the binary format or a table store
+_flat_tables = {}
+
+# low and high nibble of every byte value
+_LOW_NIBBLE = bytes(bytearray(b & 0x0f for b in range(256)))
+_HIGH_NIBBLE = bytes(bytearray(b >> 4 for b in range(256)))
+
+# distance mod 3 of every value of a decoded pruning table
+_MOD3 = bytes(bytearray(b % 3 for b in range(256)))
+
+# In-memory layout of the pruning tables used by the search: 'byte' decodes them to one value per byte, which is the
+# fastest to look up, 'nibble' keeps the two values per byte of the table files and takes half the memory, 'mod3'
+# stores the distance mod 3 in two bits, four values per byte, for a quarter of the memory. The search then derives
+# the exact distances from the distance of the parent node, see Mod3Table.
+PRUNING_LAYOUTS = ('byte', 'nibble', 'mod3')
+LAYOUT_ENV_VAR = 'PYKOCIEMBA_PRUNING_LAYOUT'
+pruning_layout = os.environ.get(LAYOUT_ENV_VAR, 'byte')
+if pruning_layout not in PRUNING_LAYOUTS:
+    log.warning('unknown pruning layout %s=%s, using byte', LAYOUT_ENV_VAR, pruning_layout)
+    pruning_layout = 'byte'
+
+# suffix of the files and table store entries of the pruning tables in the layouts which do not use the table files
+# directly
+LAYOUT_SUFFIXES = {'byte': '_Byte', 'mod3': '_Mod3'}
+PRUNING_NAMES = ('Slice_URFtoDLF_Parity_Prun', 'Slice_URtoDF_Parity_Prun', 'Slice_Twist_Prun', 'Slice_Flip_Prun')
 
 
 def setPruning(table, index, value):
@@ -35,19 +62,215 @@ def getPruning(table, index):
 
 
 def load_cachetable(name):
+    """
+    Load a table from the cache. A table store attached to this process comes first, then the memory-mapped binary
+    format. A pickled table is converted to the binary format on first use. Returns None if the table has to be
+    recalculated.
+    """
+    store = tablestore.attached()
+    if store is not None and name in store:
+        return _register(name, *store.unpack(name))
+
+    try:
+        return _register(name, *map_table(table_path(name)))
+    except (IOError, OSError, ValueError) as e:
+        log.debug('no binary cache for %s: %s', name, e)
+
     obj = None
     try:
         with open(os.path.join(cache_dir, name + '.pkl'), 'rb') as f:
             obj = cPickle.load(f)
     except IOError as e:
         log.warning(
-            'could not read cache for %s: %s. Recalculating it...', name, e)
+            'could not read cache for %s: %s. Recalculating it, `python -m pykociemba.build_tables` builds all '
+            'tables ahead of time...', name, e)
+        return None
+    try:
+        dump_cachetable(obj, name)
+        return _register(name, *map_table(table_path(name)))
+    except (IOError, OSError) as e:
+        log.warning('could not convert cache for %s: %s', name, e)
     return obj
 
 
 def dump_cachetable(obj, name):
-    with open(os.path.join(cache_dir, name + '.pkl'), 'wb') as f:
-        cPickle.dump(obj, f)
+    write_table(obj, table_path(name))
+
+
+def _register(name, flat, rows, cols):
+    _flat_tables[name] = flat
+    return as_rows(flat, rows, cols)
+
+
+def flat_movetable(name, table):
+    """
+    The move table `name` as one contiguous typed array, entry [i][m] at i * N_MOVE + m. Tables loaded from the binary
+    format already have this layout and are used without a copy.
+    """
+    flat = _flat_tables.get(name)
+    if flat is None:
+        _, _, entries = flatten(table)
+        flat = array.array(typecode_for(entries), entries)
+    return flat
+
+
+def unpack_pruning(table):
+    """Decode a pruning table with two values per byte to one value per byte."""
+    packed = bytes(bytearray(table))
+    res = bytearray(2 * len(packed))
+    res[0::2] = packed.translate(_LOW_NIBBLE)
+    res[1::2] = packed.translate(_HIGH_NIBBLE)
+    return res
+
+
+class NibbleTable(object):
+    """A pruning table with two values per byte, indexed by entry like the decoded table."""
+
+    __slots__ = ('table',)
+
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, index):
+        if index & 1:
+            return self.table[index >> 1] >> 4
+        return self.table[index >> 1] & 0x0f
+
+    def __len__(self):
+        return 2 * len(self.table)
+
+
+class Mod3Table(object):
+    """
+    A pruning table storing the distances mod 3 in two bits, four values per byte. Indexing returns the distance mod 3.
+
+    The distances of two entries one move apart differ by at most one, so the exact distance of an entry follows from
+    the one of a neighbour: distance + MOD3_DELTA[(value - distance) % 3]. The first exact distance is found by
+    walking toward the goal with distance.
+    """
+
+    __slots__ = ('table',)
+
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, index):
+        return (self.table[index >> 2] >> ((index & 3) << 1)) & 3
+
+    def __len__(self):
+        return 4 * len(self.table)
+
+    def distance(self, index, neighbours):
+        """
+        Exact distance of the entry index to the goal entry 0.
+
+        neighbours - function index -> indices of the entries one move away
+        """
+        return self.walk(index, neighbours)[0]
+
+    def walk(self, index, neighbours):
+        """Same as distance, returning (distance, number of entries read on the way)."""
+        d = 0
+        lookups = 0
+        while index != 0:
+            closer = (self[index] + 2) % 3
+            lookups += 1
+            for nb in neighbours(index):
+                lookups += 1
+                if self[nb] == closer:
+                    index = nb
+                    break
+            else:
+                raise ValueError('no path to the goal from entry %d' % index)
+            d += 1
+        return d, lookups
+
+
+MOD3_DELTA = (0, 1, -1)
+
+
+def pack_mod3(table, chunk=1 << 20):
+    """Encode a pruning table with two values per byte to a Mod3Table, `chunk` bytes of the table at a time."""
+    res = bytearray()
+    for start in range(0, len(table), chunk):
+        values = unpack_pruning(table[start:start + chunk]).translate(_MOD3)
+        n = (len(values) + 3) // 4
+        values += bytearray(4 * n - len(values))
+        # every byte of the sum is b0 + 4 * b1 + 16 * b2 + 64 * b3 <= 170, so no carry crosses a byte
+        packed = 0
+        for k in range(4):
+            packed += int.from_bytes(bytes(values[k::4]), 'little') << (2 * k)
+        res += packed.to_bytes(n, 'little')
+    return Mod3Table(res)
+
+
+def pruning_view(table, name=None):
+    """
+    The pruning table with two values per byte in the layout selected by pruning_layout. The byte and mod3 layouts of a
+    table of CoordCube, given by its name, are shared between processes like the tables themselves, see layout_table.
+    """
+    if pruning_layout == 'nibble':
+        return NibbleTable(table)
+    if name is not None:
+        return layout_table(name, table)
+    if pruning_layout == 'mod3':
+        return pack_mod3(table)
+    return unpack_pruning(table)
+
+
+def layout_table(name, table):
+    """
+    The pruning table `name` in the layout pruning_layout, without a private copy in every process: taken from the
+    attached table store, else mapped from its own file in prunetables/, which is written when it is missing or older
+    than the table file. The table with two values per byte is not read again once that file exists.
+    """
+    wrap = Mod3Table if pruning_layout == 'mod3' else lambda entries: entries
+    view = name + LAYOUT_SUFFIXES[pruning_layout]
+    store = tablestore.attached()
+    if store is not None and view in store:
+        return wrap(store.unpack(view)[0])
+    path = table_path(view)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(table_path(name)):
+            return wrap(map_table(path)[0])
+    except (IOError, OSError, ValueError) as e:
+        log.debug('no %s layout file for %s: %s', pruning_layout, name, e)
+    flat = pack_mod3(table).table if pruning_layout == 'mod3' else unpack_pruning(table)
+    try:
+        write_table(flat, path, 'B')
+        return wrap(map_table(path)[0])
+    except (IOError, OSError) as e:
+        log.warning('could not write %s: %s', path, e)
+    return wrap(flat)
+
+
+def layout_tables():
+    """{name of the layout table: entries} of the pruning tables of CoordCube in a layout with their own files"""
+    if pruning_layout not in LAYOUT_SUFFIXES:
+        return {}
+    views = {}
+    for name in PRUNING_NAMES:
+        table = getattr(CoordCube, name + 'Table')
+        views[name + LAYOUT_SUFFIXES[pruning_layout]] = getattr(table, 'table', table)
+    return views
+
+
+def set_pruning_layout(layout):
+    """Select the layout of the pruning tables of CoordCube, see PRUNING_LAYOUTS."""
+    global pruning_layout
+    if layout not in PRUNING_LAYOUTS:
+        raise ValueError('unknown pruning layout %s' % layout)
+    pruning_layout = layout
+    for name in PRUNING_NAMES:
+        setattr(CoordCube, name + 'Table', pruning_view(getattr(CoordCube, name), name))
+
+
+def install_flat(name, flat, rows):
+    """Rebind the flat variant of a table of CoordCube, e.g. after attaching to a table store."""
+    if rows:
+        setattr(CoordCube, name + 'Flat', flat)
+    else:
+        setattr(CoordCube, name + 'Table', pruning_view(flat, name))
 
 
 class CoordCube(object):
@@ -122,6 +345,9 @@ class CoordCube(object):
     # twist < 2187 in phase 2.
     # twist = 0 in phase 2.
     twistMove = load_cachetable('twistMove')
+    if not twistMove and tablegen.available():
+        twistMove = tablegen.move_table('twist', N_TWIST)
+        dump_cachetable(twistMove, 'twistMove')
     if not twistMove:
         # new short[N_TWIST][N_MOVE]
         twistMove = [[0] * N_MOVE for i in range(N_TWIST)]
@@ -143,6 +369,9 @@ class CoordCube(object):
     log.debug('Preparing move table for the flips of the edges')
 
     flipMove = load_cachetable('flipMove')
+    if not flipMove and tablegen.available():
+        flipMove = tablegen.move_table('flip', N_FLIP)
+        dump_cachetable(flipMove, 'flipMove')
     if not flipMove:
         # new short[N_FLIP][N_MOVE]
         flipMove = [[0] * N_MOVE for i in range(N_FLIP)]
@@ -160,10 +389,7 @@ class CoordCube(object):
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # Parity of the corner permutation. This is the same as the parity for the edge permutation of a valid cube.
     # parity has values 0 and 1
-    parityMove = [
-        [1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 1],
-        [0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0],
-    ]
+    parityMove = tablegen.PARITY_MOVE
 
     # ***********************************Phase 1 and 2 movetable********************************************************
     log.debug('Preparing move table for the four UD-slice edges FR, FL, Bl and BR')
@@ -174,6 +400,9 @@ class CoordCube(object):
     # FRtoBRMove = 0 for solved cube
 
     FRtoBR_Move = load_cachetable('FRtoBR_Move')
+    if not FRtoBR_Move and tablegen.available():
+        FRtoBR_Move = tablegen.move_table('FRtoBR', N_FRtoBR)
+        dump_cachetable(FRtoBR_Move, 'FRtoBR_Move')
     if not FRtoBR_Move:
         # new short[N_FRtoBR][N_MOVE]
         FRtoBR_Move = [[0] * N_MOVE for i in range(N_FRtoBR)]
@@ -196,6 +425,9 @@ class CoordCube(object):
     # URFtoDLF = 0 for solved cube.
     log.debug('Preparing move table for permutation of six corners. The positions of the DBL and DRB corners are determined by the parity.')
     URFtoDLF_Move = load_cachetable('URFtoDLF_Move')
+    if not URFtoDLF_Move and tablegen.available():
+        URFtoDLF_Move = tablegen.move_table('URFtoDLF', N_URFtoDLF)
+        dump_cachetable(URFtoDLF_Move, 'URFtoDLF_Move')
     if not URFtoDLF_Move:
         # new short[N_URFtoDLF][N_MOVE]
         URFtoDLF_Move = [[0] * N_MOVE for i in range(N_URFtoDLF)]
@@ -217,6 +449,9 @@ class CoordCube(object):
     # URtoDF = 0 for solved cube.
     log.debug('Preparing move table for the permutation of six U-face and D-face edges in phase2. The positions of the DL and DB edges are')
     URtoDF_Move = load_cachetable('URtoDF_Move')
+    if not URtoDF_Move and tablegen.available():
+        URtoDF_Move = tablegen.move_table('URtoDF', N_URtoDF)
+        dump_cachetable(URtoDF_Move, 'URtoDF_Move')
     if not URtoDF_Move:
         # new short[N_URtoDF][N_MOVE]
         URtoDF_Move = [[0] * N_MOVE for i in range(N_URtoDF)]
@@ -237,6 +472,9 @@ class CoordCube(object):
     # Move table for the three edges UR,UF and UL in phase1.
     log.debug('Preparing move table for the three edges UR,UF and UL in phase1.')
     URtoUL_Move = load_cachetable('URtoUL_Move')
+    if not URtoUL_Move and tablegen.available():
+        URtoUL_Move = tablegen.move_table('URtoUL', N_URtoUL)
+        dump_cachetable(URtoUL_Move, 'URtoUL_Move')
     if not URtoUL_Move:
         # new short[N_URtoUL][N_MOVE]
         URtoUL_Move = [[0] * N_MOVE for i in range(N_URtoUL)]
@@ -254,6 +492,9 @@ class CoordCube(object):
     # Move table for the three edges UB,DR and DF in phase1.
     log.debug('Preparing move table for the three edges UB,DR and DF in phase1.')
     UBtoDF_Move = load_cachetable('UBtoDF_Move')
+    if not UBtoDF_Move and tablegen.available():
+        UBtoDF_Move = tablegen.move_table('UBtoDF', N_UBtoDF)
+        dump_cachetable(UBtoDF_Move, 'UBtoDF_Move')
     if not UBtoDF_Move:
         # new short[N_UBtoDF][N_MOVE]
         UBtoDF_Move = [[0] * N_MOVE for i in range(N_UBtoDF)]
@@ -271,6 +512,9 @@ class CoordCube(object):
     # Table to merge the coordinates of the UR,UF,UL and UB,DR,DF edges at the beginning of phase2
     log.debug('Preparing table to merge the coordinates of the UR,UF,UL and UB,DR,DF edges at the beginning of phase2')
     MergeURtoULandUBtoDF = load_cachetable('MergeURtoULandUBtoDF')
+    if not MergeURtoULandUBtoDF and tablegen.available():
+        MergeURtoULandUBtoDF = tablegen.merge_table(336)
+        dump_cachetable(MergeURtoULandUBtoDF, 'MergeURtoULandUBtoDF')
     if not MergeURtoULandUBtoDF:
         # new short[336][336]
         MergeURtoULandUBtoDF = [[0] * 336 for i in range(336)]
@@ -289,6 +533,9 @@ class CoordCube(object):
     log.debug(
         'Preparing pruning table for the permutation of the corners and the UD-slice edges in phase2.')
     Slice_URFtoDLF_Parity_Prun = load_cachetable('Slice_URFtoDLF_Parity_Prun')
+    if not Slice_URFtoDLF_Parity_Prun and tablegen.available():
+        Slice_URFtoDLF_Parity_Prun = tablegen.phase2_pruning(URFtoDLF_Move, FRtoBR_Move, parityMove, N_URFtoDLF)
+        dump_cachetable(Slice_URFtoDLF_Parity_Prun, 'Slice_URFtoDLF_Parity_Prun')
     if not Slice_URFtoDLF_Parity_Prun:
         # new byte[N_SLICE2 * N_URFtoDLF * N_PARITY / 2]
         Slice_URFtoDLF_Parity_Prun = [-1] * \
@@ -328,6 +575,9 @@ class CoordCube(object):
     # The pruning table entries give a lower estimation for the number of moves to reach the solved cube.
     log.debug('Preparing pruning table for the permutation of the edges in phase2.')
     Slice_URtoDF_Parity_Prun = load_cachetable('Slice_URtoDF_Parity_Prun')
+    if not Slice_URtoDF_Parity_Prun and tablegen.available():
+        Slice_URtoDF_Parity_Prun = tablegen.phase2_pruning(URtoDF_Move, FRtoBR_Move, parityMove, N_URtoDF)
+        dump_cachetable(Slice_URtoDF_Parity_Prun, 'Slice_URtoDF_Parity_Prun')
     if not Slice_URtoDF_Parity_Prun:
         # new byte[N_SLICE2 * N_URtoDF * N_PARITY / 2]
         Slice_URtoDF_Parity_Prun = [-1] * (N_SLICE2 * N_URtoDF * N_PARITY // 2)
@@ -364,6 +614,9 @@ class CoordCube(object):
     # The pruning table entries give a lower estimation for the number of moves to reach the H-subgroup.
     log.debug('Pruning table for the twist of the corners and the position (not permutation) of the UD-slice edges in phase1')
     Slice_Twist_Prun = load_cachetable('Slice_Twist_Prun')
+    if not Slice_Twist_Prun and tablegen.available():
+        Slice_Twist_Prun = tablegen.phase1_pruning(twistMove, FRtoBR_Move, N_TWIST)
+        dump_cachetable(Slice_Twist_Prun, 'Slice_Twist_Prun')
     if not Slice_Twist_Prun:
         # new byte[N_SLICE1 * N_TWIST / 2 + 1]
         Slice_Twist_Prun = [-1] * (N_SLICE1 * N_TWIST // 2 + 1)
@@ -392,6 +645,9 @@ class CoordCube(object):
     # The pruning table entries give a lower estimation for the number of moves to reach the H-subgroup.
     log.debug('Pruning table for the flip of the edges and the position (not permutation) of the UD-slice edges in phase1')
     Slice_Flip_Prun = load_cachetable('Slice_Flip_Prun')
+    if not Slice_Flip_Prun and tablegen.available():
+        Slice_Flip_Prun = tablegen.phase1_pruning(flipMove, FRtoBR_Move, N_FLIP)
+        dump_cachetable(Slice_Flip_Prun, 'Slice_Flip_Prun')
     if not Slice_Flip_Prun:
         # new byte[N_SLICE1 * N_FLIP / 2]
         Slice_Flip_Prun = [-1] * (N_SLICE1 * N_FLIP // 2)
@@ -413,3 +669,21 @@ class CoordCube(object):
                             done += 1
             depth += 1
         dump_cachetable(Slice_Flip_Prun, 'Slice_Flip_Prun')
+
+    # ****************************************Flat tables for the search************************************************
+    # One contiguous typed array per move table with stride N_MOVE (336 for MergeURtoULandUBtoDF), and the pruning
+    # tables *_PrunTable indexed by entry in the layout of pruning_layout (see pruning_view), so that a lookup in the
+    # search is a single indexing.
+    twistMoveFlat = flat_movetable('twistMove', twistMove)
+    flipMoveFlat = flat_movetable('flipMove', flipMove)
+    parityMoveFlat = parityMove[0] + parityMove[1]
+    FRtoBR_MoveFlat = flat_movetable('FRtoBR_Move', FRtoBR_Move)
+    URFtoDLF_MoveFlat = flat_movetable('URFtoDLF_Move', URFtoDLF_Move)
+    URtoDF_MoveFlat = flat_movetable('URtoDF_Move', URtoDF_Move)
+    URtoUL_MoveFlat = flat_movetable('URtoUL_Move', URtoUL_Move)
+    UBtoDF_MoveFlat = flat_movetable('UBtoDF_Move', UBtoDF_Move)
+    MergeURtoULandUBtoDFFlat = flat_movetable('MergeURtoULandUBtoDF', MergeURtoULandUBtoDF)
+    Slice_URFtoDLF_Parity_PrunTable = pruning_view(Slice_URFtoDLF_Parity_Prun, 'Slice_URFtoDLF_Parity_Prun')
+    Slice_URtoDF_Parity_PrunTable = pruning_view(Slice_URtoDF_Parity_Prun, 'Slice_URtoDF_Parity_Prun')
+    Slice_Twist_PrunTable = pruning_view(Slice_Twist_Prun, 'Slice_Twist_Prun')
+    Slice_Flip_PrunTable = pruning_view(Slice_Flip_Prun, 'Slice_Flip_Prun')
@@ -98,8 +98,7 @@ class CubieCube(object):
         be computed by addition modulo three in the cyclic group C3 any more. Instead the rules below give an addition in
         the dihedral group D3 with 6 elements.<br>
 
-        NOTE: Because we do not use symmetry reductions and hence no mirrored cubes in this simple implementation of the
-        Two-Phase-Algorithm, some code is not necessary here.
+        NOTE: The search itself uses no mirrored cubes, they only appear in the symmetries of the symmetry module.
 
         b - CubieCube instance
         """
@@ -118,20 +117,20 @@ class CubieCube(object):
                 if ori >= 3:
                     ori -= 3    # the composition is a regular cube
 
-            # +++++++++++++++++++++not used in this implementation +++++++++++++
+            # +++++++++++++++++++++mirrored cubes, see symmetry.py +++++++++++++
             elif oriA < 3 and oriB >= 3:    # if cube b is in a mirrored
                 # state...
-                ori = (oriA + oriB) & 0xff
+                ori = oriA + oriB
                 if ori >= 6:
                     ori -= 3    # the composition is a mirrored cube
             elif oriA >= 3 and oriB < 3:    # if cube a is an a mirrored
                 # state...
-                ori = (oriA - oriB) & 0xff
+                ori = oriA - oriB
                 if ori < 3:
                     ori += 3    # the composition is a mirrored cube
             elif oriA >= 3 and oriB >= 3:   # if both cubes are in mirrored
                 # states...
-                ori = (oriA - oriB) & 0xff
+                ori = oriA - oriB
                 if ori < 0:
                     ori += 3    # the composition is a regular cube
             # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -526,6 +525,15 @@ class CubieCube(object):
             self.ep[j] = perm[x]
             x -= 1
 
+    def canonical(self):
+        """
+        The representative of the class of this cube under the 48 symmetries of the cube and inversion, with the
+        transformation, see symmetry.canonical.
+        """
+        from .symmetry import canonical
+
+        return canonical(self)
+
     def verify(self):
         """
         Check a cubiecube for solvability. Return the error code.
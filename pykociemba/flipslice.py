@@ -0,0 +1,215 @@
+"""
+Symmetry-reduced phase1 coordinate and pruning table.
+
+The phase1 coordinates flip and slice are combined to flipslice = 2048 * slice + flip (1013760 values). The 16
+symmetries of the cube which keep the UD axis (symCube[0:16]) split them into 64430 classes, FlipSliceSym is the index
+of the class. A cube with flipslice x is conjugated by the symmetry S = FlipSlice_Sym[x] to the representative of its
+class, S^-1 * C * S, whose twist is TwistConj[16 * twist + S]. The conjugate has the same phase1 distance, so the
+pruning table FlipSliceTwist_Prun over the 64430 * 2187 (class, twist) entries holds the exact phase1 distance of every
+cube.
+
+The tables are generated with numpy by `python -m pykociemba.build_tables flipslice`, which takes a minute or two and
+about 1.5 GB of memory, and are cached in prunetables/ like the tables of CoordCube. Search uses them after
+Search.useFlipSliceTwist().
+"""
+from builtins import range
+import array
+import logging
+
+from .symmetry import conjugate, inverse, symCube
+from .tablefile import map_table, table_path, write_table
+from .tablegen import UNSET, ALL_MOVES, load_checkpoint, save_checkpoint
+
+log = logging.getLogger(__name__)
+
+N_SYM = 16              # symmetries of the cube which keep the UD axis
+N_FLIP = 2048
+N_SLICE1 = 495
+N_TWIST = 2187
+N_FLIPSLICE = N_FLIP * N_SLICE1
+N_FLIPSLICE_CLASS = 64430
+
+TABLE_NAMES = ('FlipSlice_Class', 'FlipSlice_Sym', 'TwistConj', 'FlipSliceTwist_Prun')
+
+_tables = {}     # pruning layout -> tables loaded by load
+
+
+def twist_conj_table():
+    """TwistConj[16 * twist + s]: twist of S^-1 * C * S for a cube C with twist, S = symCube[s]"""
+    from .cubiecube import CubieCube
+
+    table = [0] * (N_TWIST * N_SYM)
+    c = CubieCube()
+    for t in range(N_TWIST):
+        c.setTwist(t)
+        for s in range(N_SYM):
+            table[N_SYM * t + s] = conjugate(c, symCube[s]).getTwist()
+    return table
+
+
+def flipslice_conj():
+    """Matrix [N_SYM, N_FLIPSLICE] of the flipslice of S^-1 * C * S for every symmetry S and flipslice of C."""
+    import numpy as np
+
+    from .edge import FR, BR
+    from .tablegen import decode, encode_orientation, encode_permutation
+
+    sliceEp, _ = decode('FRtoBR', N_SLICE1 * 24)
+    sliceEp = sliceEp[::24]     # any order of the slice edges will do
+    _, flipEo = decode('flip', N_FLIP)
+    ep = np.repeat(sliceEp, N_FLIP, axis=0)
+    eo = np.tile(flipEo, (N_SLICE1, 1))
+
+    conj = np.empty((N_SYM, N_FLIPSLICE), dtype=np.int32)
+    for s in range(N_SYM):
+        sym = symCube[s]
+        inv = inverse(sym)
+        # Y = S^-1 * C, then D = Y * S
+        yEp = np.array(inv.ep)[ep]
+        yEo = (eo + np.array(inv.eo)[ep]) % 2
+        sEp = np.array(sym.ep)
+        dEp = yEp[:, sEp]
+        dEo = (yEo[:, sEp] + np.array(sym.eo)) % 2
+        _slice, _ = encode_permutation(dEp, FR, BR, descending=True)
+        conj[s] = N_FLIP * _slice + encode_orientation(dEo, 2)
+    return conj
+
+
+def flipslice_classes(conj):
+    """
+    (FlipSlice_Class, FlipSlice_Sym, representatives, stabilizers) from flipslice_conj. The representative of a class
+    is its smallest flipslice, stabilizers[c, s] is True if symmetry s maps the representative of class c to itself.
+    """
+    import numpy as np
+
+    rep = conj.min(axis=0)
+    sym = conj.argmin(axis=0).astype(np.uint8)
+    reps = np.unique(rep)
+    if len(reps) != N_FLIPSLICE_CLASS:
+        raise ValueError('%d flipslice classes instead of %d' % (len(reps), N_FLIPSLICE_CLASS))
+    classIdx = np.searchsorted(reps, rep).astype(np.uint16)
+    stabilizers = (conj[:, reps] == reps).T
+    return classIdx, sym, reps, stabilizers
+
+
+def pruning_table(classIdx, sym, reps, stabilizers, twistConj, moveTables, checkpoint=None, progress=None):
+    """
+    Exact phase1 distance of every (class, twist) entry 2187 * class + twist, one entry per byte.
+
+    moveTables - (flipMove, twistMove, FRtoBR_Move) of CoordCube
+    checkpoint, progress - see tablegen.bfs
+    """
+    import numpy as np
+
+    from .tablegen import as_array
+
+    flipMove = as_array(moveTables[0])
+    twistMove = as_array(moveTables[1]).astype(np.int32).T.copy()
+    sliceMove = as_array(moveTables[2][::24][:N_SLICE1]) // 24
+    twistConj = np.array(twistConj, dtype=np.int32)
+
+    # move table of the classes: class and symmetry of the representative after each move
+    flip = reps % N_FLIP
+    _slice = reps // N_FLIP
+    moved = N_FLIP * sliceMove[_slice] + flipMove[flip]
+    classMove = classIdx[moved].astype(np.int32).T.copy()
+    symMove = sym[moved].astype(np.int32).T.copy()
+
+    symmetric = np.flatnonzero(stabilizers[:, 1:].any(axis=1))
+    isSymmetric = np.zeros(N_FLIPSLICE_CLASS, dtype=bool)
+    isSymmetric[symmetric] = True
+
+    size = N_FLIPSLICE_CLASS * N_TWIST
+    saved = load_checkpoint(checkpoint, size) if checkpoint else None
+    if saved is not None:
+        dist, depth = saved
+        log.info('resuming %s at depth %d', checkpoint, depth)
+    else:
+        dist = np.full(size, UNSET, dtype=np.uint8)
+        dist[0] = 0
+        depth = 0
+    done = size - int(np.count_nonzero(dist == UNSET))
+    chunk = 1 << 21
+    while done != size:
+        frontier = np.flatnonzero(dist == depth).astype(np.int32)
+        if not len(frontier):
+            raise ValueError('%d entries are unreachable' % (size - done))
+        for i in range(0, len(frontier), chunk):
+            f = frontier[i:i + chunk]
+            c = f // N_TWIST
+            t = f % N_TWIST
+            for mv in ALL_MOVES:
+                nb = classMove[mv][c] * N_TWIST + twistConj[twistMove[mv][t] * N_SYM + symMove[mv][c]]
+                nb = nb[dist[nb] == UNSET]
+                dist[nb] = depth + 1
+                # a representative with symmetries stands for the same cube with the conjugated twists
+                nb = nb[isSymmetric[nb // N_TWIST]]
+                if len(nb):
+                    nc = nb // N_TWIST
+                    nt = nb % N_TWIST
+                    for s in range(1, N_SYM):
+                        has = stabilizers[nc, s]
+                        dist[nc[has] * N_TWIST + twistConj[nt[has] * N_SYM + s]] = depth + 1
+        done = size - int(np.count_nonzero(dist == UNSET))
+        depth += 1
+        log.info('depth %d: %d of %d entries done', depth, done, size)
+        if checkpoint:
+            save_checkpoint(checkpoint, dist, depth)
+        if progress is not None:
+            progress(depth, done, size)
+    return dist
+
+
+def generate(directory=None, moveTables=None, checkpoint=None, progress=None):
+    """
+    Generate and cache the tables. Returns them like load, or None if they are written to another directory than
+    prunetables/.
+
+    moveTables - (flipMove, twistMove, FRtoBR_Move), the ones of CoordCube by default
+    checkpoint, progress - see pruning_table
+    """
+    import numpy as np
+
+    from .tablegen import pack_nibbles
+
+    if moveTables is None:
+        from .coordcube import CoordCube
+
+        moveTables = CoordCube.flipMove, CoordCube.twistMove, CoordCube.FRtoBR_Move
+    log.info('generating the flipslice symmetry tables')
+    twistConj = twist_conj_table()
+    classIdx, sym, reps, stabilizers = flipslice_classes(flipslice_conj())
+    log.info('generating the flipslice-twist pruning table')
+    dist = pruning_table(classIdx, sym, reps, stabilizers, twistConj, moveTables, checkpoint, progress)
+
+    write_table(array.array('H', classIdx.astype(np.uint16).tobytes()), table_path('FlipSlice_Class', directory), 'H')
+    write_table(bytearray(sym.tobytes()), table_path('FlipSlice_Sym', directory), 'B')
+    write_table(twistConj, table_path('TwistConj', directory), 'H')
+    write_table(pack_nibbles(dist), table_path('FlipSliceTwist_Prun', directory), 'B')
+    if directory is None:
+        _tables.clear()
+        return load()
+    return None
+
+
+def load():
+    """
+    The tables (FlipSlice_Class, FlipSlice_Sym, TwistConj, FlipSliceTwist_Prun) for the search, the pruning table
+    indexed by entry in the layout of coordcube.pruning_layout, nibbles for mod3. Returns None if they are not cached,
+    they are only generated by generate.
+    """
+    from . import coordcube
+
+    layout = coordcube.pruning_layout
+    if layout not in _tables:
+        try:
+            flats = [map_table(table_path(name))[0] for name in TABLE_NAMES]
+        except (IOError, OSError, ValueError) as e:
+            log.debug('no cached flipslice tables: %s', e)
+            return None
+        if layout == 'mod3':    # phase1 tracks no distances with this table
+            prun = coordcube.NibbleTable(flats[3])
+        else:
+            prun = coordcube.pruning_view(flats[3])
+        _tables[layout] = flats[0], flats[1], flats[2], prun
+    return _tables[layout]
@@ -0,0 +1,278 @@
+"""
+Table of the last layer cases.
+
+A cube whose pieces are all solved but the four corners and four edges of one face, like the ones of
+tools.randomLastLayerCube, is in one of 62208 cases of that layer: 24 * 24 / 2 permutations of matching parity, 27
+corner twists and 8 edge flips. Turning the layer before and after (the AUF) leaves 3916 classes of cases. Turning it
+before and after by the same amount is the same as turning the whole cube about the axis of the layer, a symmetry, so
+every case is the conjugate of one of the four cases rep * D^k of its class by a rotation. The table holds a maneuver
+for each of these 15664 variants, the shortest Search finds within a node budget, which is at most as long as the
+first solution of Search, and the variant and rotation of every case, so solve() answers a last layer cube without a
+search and without adding AUF turns.
+
+The table is for the D layer. The cases of the other faces are conjugated to the D layer by a rotation of the cube and
+the maneuver is mapped back, see symmetry. LastLayer_Cases holds 4 * variant + rotation for every index of get_index,
+or UNUSED if the parities do not match, LastLayer_Maneuvers a row of moves (3 * axis + power - 1) per variant
+4 * class + k, padded with NO_MOVE. Build them with `python -m pykociemba.build_tables lastlayer`, which takes about
+two hours on one core; solve() only uses them once they are there.
+"""
+from builtins import range
+import itertools
+import logging
+
+from .cubiecube import CubieCube, moveCube
+from .tablefile import map_table, table_path, write_table
+
+log = logging.getLogger(__name__)
+
+N_PERM = 24     # permutations of the four corners or edges
+N_TWIST = 27    # orientations of three corners, the fourth follows
+N_FLIP = 8      # orientations of three edges, the fourth follows
+N_INDEX = N_PERM * N_TWIST * N_PERM * N_FLIP
+N_CLASS = 3916
+UNUSED = 0xffff
+NO_MOVE = 0xff
+D = 3           # axis of the layer of the table
+N_VARIANT = 4 * N_CLASS
+MAX_NODES = 200000  # node budget of Search for a shorter maneuver of a variant
+
+TABLE_NAMES = ('LastLayer_Cases', 'LastLayer_Maneuvers')
+
+_perms = list(itertools.permutations(range(4)))
+_permRank = dict((p, i) for i, p in enumerate(_perms))
+
+
+def _layer(ax):
+    """(corners, edges): the positions turned by the moves of axis ax, in the order the move cycles them"""
+    m = moveCube[ax]
+    corners = [i for i in range(8) if m.cp[i] != i]
+    edges = [i for i in range(12) if m.ep[i] != i]
+    return corners, edges
+
+
+LAYERS = [_layer(ax) for ax in range(6)]
+CORNERS, EDGES = LAYERS[D]
+
+_tables = None
+_symmetry = [None] * 6  # index of the rotation which maps the layer of each axis to the D layer
+_rotations = []         # indices of the 4 rotations of symmetry.symCube about the axis of the D layer
+
+
+def get_index(cc):
+    """Index of the D layer of the CubieCube cc, all other pieces solved."""
+    cp = tuple(CORNERS.index(cc.cp[i]) for i in CORNERS)
+    ep = tuple(EDGES.index(cc.ep[i]) for i in EDGES)
+    twist = 0
+    for i in CORNERS[:3]:
+        twist = 3 * twist + cc.co[i]
+    flip = 0
+    for i in EDGES[:3]:
+        flip = 2 * flip + cc.eo[i]
+    return ((_permRank[cp] * N_TWIST + twist) * N_PERM + _permRank[ep]) * N_FLIP + flip
+
+
+def set_index(index):
+    """The CubieCube of index, None if the parities of its corners and edges do not match."""
+    index, flip = divmod(index, N_FLIP)
+    index, ep = divmod(index, N_PERM)
+    cp, twist = divmod(index, N_TWIST)
+    cc = CubieCube()
+    for i, j in enumerate(_perms[cp]):
+        cc.cp[CORNERS[i]] = CORNERS[j]
+    for i, j in enumerate(_perms[ep]):
+        cc.ep[EDGES[i]] = EDGES[j]
+    for i in reversed(CORNERS[:3]):
+        twist, cc.co[i] = divmod(twist, 3)
+    cc.co[CORNERS[3]] = -sum(cc.co) % 3
+    for i in reversed(EDGES[:3]):
+        flip, cc.eo[i] = divmod(flip, 2)
+    cc.eo[EDGES[3]] = sum(cc.eo) % 2
+    if cc.edgeParity() != cc.cornerParity():
+        return None
+    return cc
+
+
+def layer_of(cc):
+    """Axis of the only layer with unsolved pieces of the CubieCube cc, None if there are others."""
+    corners = set(i for i in range(8) if cc.cp[i] != i or cc.co[i])
+    edges = set(i for i in range(12) if cc.ep[i] != i or cc.eo[i])
+    for ax in range(6):
+        if corners.issubset(LAYERS[ax][0]) and edges.issubset(LAYERS[ax][1]):
+            return ax
+    return None
+
+
+def _aufs():
+    """The D layer turned 0 to 3 quarter turns, as CubieCubes"""
+    from .symmetry import moves
+
+    return [CubieCube()] + [moves[3 * D + power - 1] for power in range(1, 4)]
+
+
+def _classes():
+    """
+    (class of every index or UNUSED, representatives). The classes are numbered in the order of their smallest index,
+    which is the representative.
+    """
+    from .symmetry import product
+
+    aufs = _aufs()
+    classIdx = [UNUSED] * N_INDEX
+    reps = []
+    for index in range(N_INDEX):
+        if classIdx[index] != UNUSED:
+            continue
+        cc = set_index(index)
+        if cc is None:
+            continue
+        for before in aufs:
+            for after in aufs:
+                classIdx[get_index(product(before, cc, after))] = len(reps)
+        reps.append(index)
+    if len(reps) != N_CLASS:
+        raise ValueError('%d last layer classes instead of %d' % (len(reps), N_CLASS))
+    return classIdx, reps
+
+
+def _maneuver(search, cc, maxNodes):
+    """The shortest maneuver solving cc which Search finds with maxNodes nodes, or the first one if it needs more"""
+    if get_index(cc) == 0:
+        return []
+    facelets = cc.toFaceCube().to_String()
+    best = None
+    for res in search.solutions(facelets, 24, float('inf'), False, maxNodes):
+        if res.startswith('Error'):
+            break
+        best = [3 * search.ax[i] + search.po[i] - 1 for i in range(search.length)]
+    if best is None:
+        search.solution(facelets, 24, float('inf'), False)
+        best = [3 * search.ax[i] + search.po[i] - 1 for i in range(search.length)]
+    return best
+
+
+def rotations():
+    """Indices of the symmetries of symmetry.symCube which turn the whole cube about the axis of the D layer"""
+    from .symmetry import sym_moves
+
+    if not _rotations:
+        _rotations.extend(idx for idx in range(48) if sym_moves(idx)[3 * D] == 3 * D)
+    return _rotations
+
+
+def generate(directory=None, maxNodes=MAX_NODES, progress=None):
+    """
+    Generate and cache the tables with Search. Returns them like load, or None if they are written to another
+    directory than prunetables/.
+
+    maxNodes - node budget of the search for each variant
+    progress - function(depth, done, size) like in tablegen.bfs, called with depth 0 and the number of variants done
+    """
+    from .search import Search
+    from .symmetry import conjugate, product, symCube
+
+    log.info('generating the last layer classes')
+    _, reps = _classes()
+    log.info('%d classes, searching the maneuvers of their %d variants', len(reps), N_VARIANT)
+    search = Search()
+    aufs = _aufs()
+    variants = {}       # index of the case -> variant
+    maneuvers = []
+    for c, index in enumerate(reps):
+        rep = set_index(index)
+        for k in range(4):
+            cc = product(rep, aufs[k])
+            v = variants.setdefault(get_index(cc), len(maneuvers))
+            maneuvers.append(maneuvers[v] if v < len(maneuvers) else _maneuver(search, cc, maxNodes))
+            if progress is not None and len(maneuvers) % 100 == 0:
+                progress(0, len(maneuvers), N_VARIANT)
+
+    # the rotation of every case to the variant with the shortest maneuver
+    rots = rotations()
+    entries = [UNUSED] * N_INDEX
+    for index in range(N_INDEX):
+        cc = set_index(index)
+        if cc is None:
+            continue
+        best = None
+        for r, idx in enumerate(rots):
+            v = variants.get(get_index(conjugate(cc, symCube[idx])))
+            if v is not None and (best is None or len(maneuvers[v]) < len(maneuvers[best >> 2])):
+                best = 4 * v + r
+        if best is None:
+            raise ValueError('the case %d is no rotation of a variant' % index)
+        entries[index] = best
+
+    cols = max(len(m) for m in maneuvers)
+    rows = [m + [NO_MOVE] * (cols - len(m)) for m in maneuvers]
+    write_table(entries, table_path('LastLayer_Cases', directory), 'H')
+    write_table(rows, table_path('LastLayer_Maneuvers', directory), 'B')
+    return load() if directory is None else None
+
+
+def load():
+    """The tables (LastLayer_Index, LastLayer_Moves), None if they are not built."""
+    global _tables
+    if _tables is None:
+        try:
+            index, _, _ = map_table(table_path('LastLayer_Cases'))
+            flat, _, cols = map_table(table_path('LastLayer_Maneuvers'))
+        except (IOError, OSError, ValueError) as e:
+            log.debug('no last layer tables: %s', e)
+            _tables = ()
+        else:
+            _tables = index, flat, cols
+    return _tables or None
+
+
+def _rotation(ax):
+    """Index of a rotation S of symmetry.symCube with S * D * S^-1 on the axis ax, so S^-1 * C * S has the layer of ax
+    of C as D layer"""
+    from .symmetry import sym_moves
+
+    if _symmetry[ax] is None:
+        _symmetry[ax] = next(idx for idx in range(0, 48, 2) if sym_moves(idx)[3 * D] // 3 == ax)
+    return _symmetry[ax]
+
+
+def solve(cc):
+    """
+    Moves (3 * axis + power - 1) solving the solvable CubieCube cc if all of its pieces but the ones of one layer are
+    solved, else None. None as well without the tables.
+    """
+    tables = load()
+    if tables is None:
+        return None
+    ax = layer_of(cc)
+    if ax is None:
+        return None
+    from .symmetry import conjugate, map_solution, symCube, sym_moves
+
+    index, flat, cols = tables
+    if ax != D:
+        idx = _rotation(ax)
+        cc = conjugate(cc, symCube[idx])
+    entry = index[get_index(cc)]
+    v = entry >> 2
+    maneuver = [mv for mv in flat[v * cols:(v + 1) * cols] if mv != NO_MOVE]
+    # the maneuver solves S^-1 * cc * S for the rotation S of the entry
+    moves = map_solution(maneuver, sym_moves(rotations()[entry & 3]), False)
+    if ax != D:
+        moves = map_solution(moves, sym_moves(idx), False)
+    return moves
+
+
+def lookup(facelets):
+    """solve for a facelet string, None if it is no valid cube or the tables are missing."""
+    if load() is None:
+        return None
+    from .facecube import FaceCube
+    from .symmetry import move_names
+
+    try:
+        cc = FaceCube(facelets).toCubieCube()
+    except Exception:
+        return None
+    if cc.verify() != 0:
+        return None
+    moves = solve(cc)
+    return None if moves is None else [move_names[mv] for mv in moves]
@@ -0,0 +1,195 @@
+"""
+Parallel phase1 search.
+
+ParallelSearch runs the phase1 IDA* of Search one depth at a time. The maneuvers of every depth are partitioned by
+their first moves and the parts are searched by a pool of processes. The first solution found at the smallest depth
+wins and the workers still searching that depth are cancelled.
+
+    with ParallelSearch(workers=4) as search:
+        print(search.solution(facelets, 20, 60, False))
+
+OrientationRace searches the cube in its three orientations relative to the UD-slice of phase1, and the inverses of
+the three, in parallel and maps the solution found back to the original cube.
+"""
+from builtins import range
+import multiprocessing
+import time
+
+from . import canonical
+from .facecube import FaceCube
+from .search import Search
+from .symmetry import ROT_URF3, conjugate, conjugate_moves, inverse, map_solution, power
+from .tablestore import TableStore, init_worker, shared_memory
+
+_cancel = None      # multiprocessing.Event set by the coordinator, in the workers
+_search = None      # Search object of a worker
+
+
+def _init_worker(cancel, storeName):
+    global _cancel
+    _cancel = cancel
+    if storeName is not None:
+        init_worker(storeName)
+
+
+def _search_part(task):
+    """Search one depth of phase1 restricted to some first moves. Returns (error code, solution string, nodes)."""
+    global _search
+    facelets, maxDepth, timeOut, depthPhase1, prefixes, useSeparator = task
+    if _search is None:
+        _search = Search()
+    if _cancel.is_set():
+        return -9, None, 0
+    _search.prepare(facelets)
+    s = _search.search(maxDepth, timeOut, depthPhase1, depthPhase1, prefixes, _cancel.is_set)
+    if s < 0:
+        return s, None, _search.nodes
+    return 0, _search.solutionToString(s, _search.depthPhase1 if useSeparator else None), _search.nodes
+
+
+def _search_orientation(task):
+    """Search one orientation of a cube. Returns (orientation, error code, moves, nodes)."""
+    global _search
+    index, facelets, maxDepth, timeOut = task
+    if _search is None:
+        _search = Search()
+    if _cancel.is_set():
+        return index, -9, None, 0
+    _search.prepare(facelets)
+    s = _search.search(maxDepth, timeOut, cancelled=_cancel.is_set)
+    if s < 0:
+        return index, s, None, _search.nodes
+    return index, 0, [3 * _search.ax[i] + _search.po[i] - 1 for i in range(s)], _search.nodes
+
+
+def orientations(cc):
+    """
+    The cube cc seen along the three axes, followed by the inverses of the three, as (CubieCube, move table,
+    inverted). A solution m1 ... mk of an oriented cube is mapped to a solution of cc by the move table, and if the cube
+    is inverted, by inverting and reversing it.
+    """
+    ret = []
+    for inverted in (False, True):
+        c = inverse(cc) if inverted else cc
+        for k in range(3):
+            s = power(ROT_URF3, k)
+            ret.append((conjugate(c, s), conjugate_moves(s), inverted))
+    return ret
+
+
+def root_prefixes(length):
+    """All maneuvers of `length` moves allowed by the search, as tuples of moves."""
+    prefixes = [()]
+    for _ in range(length):
+        prefixes = [p + (mv,) for p in prefixes for mv in range(18)
+                    if canonical.PHASE1[18 * canonical.state_of(p) + mv] != canonical.DEAD]
+    return prefixes
+
+
+class _Pool(object):
+    """A pool of worker processes sharing the tables through a TableStore, cancelled by one Event."""
+
+    def __init__(self, workers):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.nodes = 0
+        self.store = TableStore.publish() if shared_memory is not None else None
+        self.cancel = multiprocessing.Event()
+        self.pool = multiprocessing.Pool(
+            self.workers, initializer=_init_worker,
+            initargs=(self.cancel, self.store.name if self.store is not None else None))
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        if self.store is not None:
+            self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParallelSearch(_Pool):
+    """Two-Phase-Algorithm with the phase1 subtrees searched by a pool of processes."""
+
+    def __init__(self, workers=None, prefixLength=2, parts=None):
+        """
+        workers - number of processes, all cores by default
+        prefixLength - the maneuvers are partitioned by their first 1 or 2 moves
+        parts - number of parts per depth, 4 per worker by default
+        """
+        super(ParallelSearch, self).__init__(workers)
+        prefixes = root_prefixes(prefixLength)
+        count = min(len(prefixes), parts or 4 * self.workers)
+        self.parts = [prefixes[i::count] for i in range(count)]
+
+    def solution(self, facelets, maxDepth, timeOut, useSeparator):
+        """Same as Search.solution, searching every phase1 depth in parallel."""
+        s = Search().prepare(facelets)
+        if s != 0:
+            return "Error %s" % abs(s)
+
+        tStart = time.time()
+        self.nodes = 0
+        for depthPhase1 in range(1, maxDepth + 1):
+            remaining = timeOut - (time.time() - tStart)
+            tasks = [(facelets, maxDepth, remaining, depthPhase1, part, useSeparator) for part in self.parts]
+            res = None
+            timedOut = False
+            for code, sol, nodes in self.pool.imap_unordered(_search_part, tasks):
+                self.nodes += nodes
+                if code == 0 and res is None:
+                    res = sol
+                    self.cancel.set()
+                elif code == -8:
+                    timedOut = True
+                    self.cancel.set()
+            self.cancel.clear()
+            if res is not None:
+                return res
+            if timedOut:
+                return "Error 8"
+        return "Error 7"
+
+
+class OrientationRace(_Pool):
+    """Two-Phase-Algorithm racing the cube in three orientations and their inverses in a pool of processes."""
+
+    def __init__(self, workers=6):
+        super(OrientationRace, self).__init__(workers)
+
+    def solution(self, facelets, maxDepth, timeOut, shortest=False):
+        """
+        Same as Search.solution without the separator, phase1 and phase2 are mixed up in a solution of an inverse.
+
+        shortest - wait for the searches of all 6 orientations and return the shortest solution, by default the first
+                   solution found wins and the other searches are cancelled
+        """
+        search = Search()
+        s = search.prepare(facelets)
+        if s != 0:
+            return "Error %s" % abs(s)
+
+        oriented = orientations(FaceCube(facelets).toCubieCube())
+        tasks = [(i, c.toFaceCube().to_String(), maxDepth, timeOut) for i, (c, _, _) in enumerate(oriented)]
+        self.nodes = 0
+        best = None
+        timedOut = False
+        for index, code, moves, nodes in self.pool.imap_unordered(_search_orientation, tasks):
+            self.nodes += nodes
+            if code == 0 and (best is None or len(moves) < len(best)):
+                _, table, inverted = oriented[index]
+                best = map_solution(moves, table, inverted)
+                if not shortest:
+                    self.cancel.set()
+            elif code == -8:
+                timedOut = True
+        self.cancel.clear()
+        if best is None:
+            return "Error 8" if timedOut else "Error 7"
+        search.length = len(best)
+        for i, mv in enumerate(best):
+            search.ax[i], search.po[i] = mv // 3, mv % 3 + 1
+        return search.solutionToString(len(best))
@@ -1,8 +1,12 @@
+import sys
 import time
 from builtins import range
+from collections import OrderedDict
+from . import canonical, endgame
+from .cancel import CancelToken
 from .color import colors
 from .facecube import FaceCube
-from .coordcube import CoordCube, getPruning
+from .coordcube import CoordCube, MOD3_DELTA, Mod3Table
 from .cubiecube import CubieCube
 
 class Search(object):
@@ -14,6 +18,7 @@ class Search(object):
     def __init__(self):
         self.ax              = [0] * 31  # The axis of the move
         self.po              = [0] * 31  # The power of the move
+        self.state           = [0] * 31  # state of the canonical move automaton before the move
         self.flip            = [0] * 31  # phase1 coordinates
         self.twist           = [0] * 31
         self.slice           = [0] * 31
@@ -25,6 +30,48 @@ class Search(object):
         self.URtoDF          = [0] * 31
         self.minDistPhase1   = [0] * 31  # IDA* distance do goal estimations
         self.minDistPhase2   = [0] * 31
+        self.distFlip        = [0] * 31  # exact distances of the pruning tables in the mod3 layout
+        self.distTwist       = [0] * 31
+        self.distCorners     = [0] * 31
+        self.distEdges       = [0] * 31
+        self.replayed        = [0] * 31  # phase1 moves the phase2 coordinates of levels 1.. were computed with
+        self.valid1          = 0         # URFtoDLF, FRtoBR and parity are valid up to this level
+        self.valid2          = 0         # URtoUL and UBtoDF are valid up to this level
+        self.phase2Cache     = OrderedDict()     # phase2 coordinates -> moves of the shortest phase2 solution,
+        self.phase2CacheSize = 1 << 15           # or the phase2 depth up to which there is none (LRU order)
+        self.phase2CacheBytes = 0
+        self.nodes           = 0         # nodes expanded by the last call of solution
+        self.length          = 0         # length and phase1 length of the last solution found
+        self.depthPhase1     = 0
+        self.stats           = None      # SearchStats filled in by the searches if set
+        self.flipSliceTwist  = None      # tables of the flipslice module, see useFlipSliceTwist
+        self.endgame         = None      # table of the endgame module, see useEndgame
+        self.endgameKeys     = None      # and its projection to the phase1 coordinates
+        self.endgameDepth    = 0
+
+    def useFlipSliceTwist(self, enable=True):
+        """
+        Prune phase1 with the exact distances of the symmetry-reduced flipslice-twist table instead of the maximum of
+        Slice_Flip_Prun and Slice_Twist_Prun. Raises IOError if the tables are not built, see flipslice.
+        """
+        from . import flipslice
+
+        self.flipSliceTwist = None
+        if enable:
+            self.flipSliceTwist = flipslice.load()
+            if self.flipSliceTwist is None:
+                raise IOError('the flipslice tables are not built, run python -m pykociemba.build_tables flipslice')
+
+    def useEndgame(self, radius=endgame.RADIUS, depth=endgame.DEPTH):
+        """
+        Look the cube up in the endgame table of the cubes up to radius moves from solved before the search, together
+        with the cubes after every maneuver of up to depth moves, and at every phase1 node and phase2 root, where a hit
+        ends the maneuver with an optimal one. A cube at most radius + depth moves from solved is solved optimally
+        without a search. A radius of 0 turns the lookups off.
+        """
+        self.endgame = endgame.table(radius) if radius else None
+        self.endgameKeys = endgame.projection(radius) if radius else None
+        self.endgameDepth = depth
 
     def solutionToString(self, length, depthPhase1=None):
         """generate the solution string from the array data"""
@@ -37,6 +84,10 @@ class Search(object):
                 s += ". "
         return s
 
+    def moves(self):
+        """The moves of the last solution found, e.g. ["R", "U2", "F'"]"""
+        return [self.ax_to_s[self.ax[i]] + self.po_to_s[self.po[i]].strip() for i in range(self.length)]
+
     def solution(self, facelets, maxDepth, timeOut, useSeparator):
         """
         Computes the solver string for a given cube.
@@ -67,6 +118,20 @@ class Search(object):
                 Error 8: Timeout, no solution within given time
         """
 
+        s = self.prepare(facelets)
+        if s == 0:
+            s = self.search(maxDepth, timeOut)
+        if s < 0:
+            return "Error %s" % abs(s)
+        return self.solutionToString(s, self.depthPhase1) if useSeparator else self.solutionToString(s)
+
+    def prepare(self, facelets):
+        """
+        Check the cube given by facelets and set it up as the root of the search.
+
+        @return 0 or the negative error code 1 to 6 of solution
+        """
+
         # +++++++++++++++++++++check for wrong input +++++++++++++++++++++++++++++
         count = [0] * 6
         try:
@@ -74,17 +139,23 @@ class Search(object):
                 assert facelets[i] in colors
                 count[colors[facelets[i]]] += 1
         except Exception:
-            return "Error 1"
+            return -1
 
         for i in range(6):
             if count[i] != 9:
-                return "Error 1"
+                return -1
 
         fc = FaceCube(facelets)
         cc = fc.toCubieCube()
         s = cc.verify()
         if s != 0:
-            return "Error %s" % abs(s)
+            return s
+
+        self.setCube(cc)
+        return 0
+
+    def setCube(self, cc):
+        """Set up the solvable CubieCube cc as the root of the search."""
 
         # +++++++++++++++++++++++ initialization +++++++++++++++++++++++++++++++++
         c = CoordCube(cc)
@@ -99,56 +170,190 @@ class Search(object):
         self.FRtoBR[0] = c.FRtoBR
         self.URtoUL[0] = c.URtoUL
         self.UBtoDF[0] = c.UBtoDF
+        self.valid1 = 0
+        self.valid2 = 0
+
+    def search(self, maxDepth, timeOut, depthPhase1=1, lastDepthPhase1=None, prefixes=None, cancelled=None,
+               maxNodes=None):
+        """
+        Run the phase1 IDA* from the cube set up with prepare or setCube.
+
+        @param depthPhase1
+                 first phase1 depth to search
+        @param lastDepthPhase1
+                 last phase1 depth to search, maxDepth by default
+        @param prefixes
+                 restricts the search to the maneuvers starting with one of these tuples of moves (3 * axis + power - 1)
+        @param cancelled
+                 function which is polled together with the timeout; the search stops when it returns True
+        @param maxNodes
+                 node budget, exceeding it is handled like a timeout
+        @return the length of the solution or a negative error code: -7 if there is no solution up to lastDepthPhase1,
+                -8 on timeout, -9 if cancelled
+        """
+        return next(self._run(maxDepth, timeOut, depthPhase1, lastDepthPhase1, prefixes, cancelled, maxNodes))
 
-        self.minDistPhase1[1] = 1   # else failure for depth=1, n=0
+    def solutions(self, facelets, maxDepth, timeOut, useSeparator, maxNodes=None):
+        """
+        Anytime version of solution: the search goes on after the first solution and yields every strictly shorter
+        solution string it finds, until no shorter solution exists or the time (seconds) or node budget runs out. The
+        last solution yielded is the best one found. Yields a single error string if the cube is invalid or no solution
+        is found in time.
+        """
+        s = self.prepare(facelets)
+        if s != 0:
+            yield "Error %s" % abs(s)
+            return
+        run = self._run(maxDepth, timeOut, 1, None, None, None, maxNodes)
+        s = next(run)
+        if s < 0:
+            yield "Error %s" % abs(s)
+            return
+        while s >= 0:
+            yield self.solutionToString(s, self.depthPhase1) if useSeparator else self.solutionToString(s)
+            s = run.send(s - 1)
+
+    def _run(self, maxDepth, timeOut, depthPhase1, lastDepthPhase1, prefixes, cancelled, maxNodes, quantum=None):
+        """
+        The phase1 IDA*, as a generator. Yields the length of every solution found, the maneuver being in ax and po,
+        and finally the negative error code which ended the search. A lower maxDepth can be sent back with each
+        solution, the search then continues for solutions of at most that length. With a quantum, it also yields None
+        whenever another quantum of nodes (phase1 and phase2) was expanded, to hand control back to the caller.
+        """
+        ax = self.ax
+        po = self.po
+        flip = self.flip
+        twist = self.twist
+        _slice = self.slice
+        minDistPhase1 = self.minDistPhase1
+        flipMove = CoordCube.flipMoveFlat
+        twistMove = CoordCube.twistMoveFlat
+        FRtoBR_Move = CoordCube.FRtoBR_MoveFlat
+        Slice_Flip_Prun = CoordCube.Slice_Flip_PrunTable
+        Slice_Twist_Prun = CoordCube.Slice_Twist_PrunTable
+        N_SLICE1 = CoordCube.N_SLICE1
+        fst = self.flipSliceTwist
+        pruning = 0     # 0: Slice_Flip_Prun and Slice_Twist_Prun, 1: the flipslice-twist table, 2: mod3 layout
+        lookups = 2     # pruning table entries read per phase1 node
+        if fst is not None:
+            pruning = 1
+            lookups = 1
+            FlipSlice_Class, FlipSlice_Sym, TwistConj, FlipSliceTwist_Prun = fst
+        elif isinstance(Slice_Flip_Prun, Mod3Table):
+            pruning = 2
+            distFlip = self.distFlip
+            distTwist = self.distTwist
+            distFlip[0], distTwist[0] = self.phase1Distances()
+            Slice_Flip_Prun = Slice_Flip_Prun.table
+            Slice_Twist_Prun = Slice_Twist_Prun.table
+
+        if lastDepthPhase1 is None:
+            lastDepthPhase1 = maxDepth
+        prefixLength = 0
+        allowed = None
+        if prefixes is not None:
+            prefixLength = max(len(p) for p in prefixes)
+            allowed = set(p[:i] for p in prefixes for i in range(1, len(p) + 1))
+
+        state = self.state
+        transitions = canonical.PHASE1
+        firstAxis = canonical.FIRST_AXIS
+        DEAD = canonical.DEAD
+
+        po[0] = 0
+        ax[0] = 0
+        state[0] = canonical.START
+        minDistPhase1[1] = depthPhase1  # else failure for n=0
+        self.nodes = 0
+        nodes = 0
         mv = 0
         n = 0
         busy = False
-        depthPhase1 = 1
+        stats = self.stats
+        if stats is not None:
+            self.cacheStats(stats)     # a search answered from the cache alone inserts nothing
+
+        endgameKeys = self.endgameKeys if prefixes is None else None
+        if self.endgame is not None and depthPhase1 == 1 and prefixes is None:
+            coords = (twist[0], flip[0], self.URFtoDLF[0], self.FRtoBR[0], self.URtoUL[0], self.UBtoDF[0],
+                      self.parity[0])
+            found = endgame.search(self.endgame, coords, min(self.endgameDepth, maxDepth))
+            if found is not None and len(found) <= maxDepth:
+                for i, mv in enumerate(found):
+                    ax[i] = mv // 3
+                    po[i] = mv % 3 + 1
+                self.length = self.depthPhase1 = len(found)
+                yield len(found)
+                yield -7    # the maneuver is optimal
+                return
 
         tStart = time.time()
+        depthStart = tStart     # start time and nodes of the current depthPhase1 for the stats
+
+        def poll(phase2Nodes):
+            """The error code which stops the search in phase2, 0 to go on"""
+            if time.time() - tStart > timeOut:
+                return -8
+            if cancelled is not None and cancelled():
+                return -9
+            if maxNodes is not None and self.nodes + nodes + phase2Nodes > maxNodes:
+                return -8
+            return 0
+
+        depthNodes = 0
+        pause = quantum         # nodes after which control is handed back
 
         # +++++++++++++++++++ Main loop ++++++++++++++++++++++++++++++++++++++++++
         while True:
             while True:
-                if depthPhase1 - n > self.minDistPhase1[n + 1] and not busy:
-                    if self.ax[n] == 0 or self.ax[n] == 3:   # Initialize next move
-                        n += 1
-                        self.ax[n] = 1
-                    else:
-                        n += 1
-                        self.ax[n] = 0
-                    self.po[n] = 1
+                if depthPhase1 - n > minDistPhase1[n + 1] and not busy:
+                    n += 1      # Initialize next move
+                    ax[n] = firstAxis[state[n]]
+                    po[n] = 1
                 else:
-                    self.po[n] += 1
-                    if self.po[n] > 3:
+                    po[n] += 1
+                    if po[n] > 3:
                         while True:
                             # increment axis
-                            self.ax[n] += 1
-                            if self.ax[n] > 5:
+                            ax[n] += 1
+                            if ax[n] > 5:
 
+                                code = 0
                                 if time.time() - tStart > timeOut:
-                                    return "Error 8"
+                                    code = -8
+                                elif cancelled is not None and cancelled():
+                                    code = -9
+                                elif maxNodes is not None and self.nodes + nodes > maxNodes:
+                                    code = -8
+                                elif n == 0 and depthPhase1 >= lastDepthPhase1:
+                                    code = -7
+                                if (code or n == 0) and stats is not None:
+                                    depthStart = stats.addDepth(depthPhase1, nodes - depthNodes, depthStart, lookups)
+                                    depthNodes = nodes
+                                if code:
+                                    self.nodes += nodes
+                                    yield code
+                                    return
+                                if quantum is not None and self.nodes + nodes >= pause:
+                                    pause = self.nodes + nodes + quantum
+                                    yield None
 
                                 if n == 0:
-                                    if depthPhase1 >= maxDepth:
-                                        return "Error 7"
-                                    else:
-                                        depthPhase1 += 1
-                                        self.ax[n] = 0
-                                        self.po[n] = 1
-                                        busy = False
-                                        break
+                                    depthPhase1 += 1
+                                    ax[n] = 0
+                                    po[n] = 1
+                                    busy = False
+                                    break
                                 else:
                                     n -= 1
                                     busy = True
                                     break
 
                             else:
-                                self.po[n] = 1
+                                po[n] = 1
                                 busy = False
 
-                            if not (n != 0 and (self.ax[n - 1] == self.ax[n] or self.ax[n - 1] - 3 == self.ax[n])):
+                            if transitions[18 * state[n] + 3 * ax[n]] != DEAD:
                                 break
                     else:
                         busy = False
@@ -157,115 +362,272 @@ class Search(object):
 
             # +++++++++++++ compute new coordinates and new minDistPhase1 ++++++++++
             # if minDistPhase1 =0, the H subgroup is reached
-            mv = 3 * self.ax[n] + self.po[n] - 1
-            self.flip[n + 1] = CoordCube.flipMove[self.flip[n]][mv]
-            self.twist[n + 1] = CoordCube.twistMove[self.twist[n]][mv]
-            self.slice[n + 1] = CoordCube.FRtoBR_Move[self.slice[n] * 24][mv] // 24
-            self.minDistPhase1[n + 1] = max(
-                getPruning(
-                    CoordCube.Slice_Flip_Prun,
-                    CoordCube.N_SLICE1 * self.flip[n + 1] + self.slice[n + 1]
-                ),
-                getPruning(
-                    CoordCube.Slice_Twist_Prun,
-                    CoordCube.N_SLICE1 * self.twist[n + 1] + self.slice[n + 1]
+            mv = 3 * ax[n] + po[n] - 1
+            if n < prefixLength and tuple(3 * ax[i] + po[i] - 1 for i in range(n + 1)) not in allowed:
+                busy = True     # skip this move
+                continue
+            nodes += 1
+            state[n + 1] = transitions[18 * state[n] + mv]
+            flip[n + 1] = flipMove[18 * flip[n] + mv]
+            twist[n + 1] = twistMove[18 * twist[n] + mv]
+            _slice[n + 1] = FRtoBR_Move[432 * _slice[n] + mv] // 24    # 432 = 24 * N_MOVE
+            if pruning == 0:
+                minDistPhase1[n + 1] = max(
+                    Slice_Flip_Prun[N_SLICE1 * flip[n + 1] + _slice[n + 1]],
+                    Slice_Twist_Prun[N_SLICE1 * twist[n + 1] + _slice[n + 1]]
                 )
-            )
+            elif pruning == 1:
+                fs = 2048 * _slice[n + 1] + flip[n + 1]
+                minDistPhase1[n + 1] = FlipSliceTwist_Prun[
+                    2187 * FlipSlice_Class[fs] + TwistConj[16 * twist[n + 1] + FlipSlice_Sym[fs]]]
+            else:
+                # the distances differ by at most one from the ones of the parent
+                i = N_SLICE1 * flip[n + 1] + _slice[n + 1]
+                d1 = distFlip[n]
+                d1 += MOD3_DELTA[(((Slice_Flip_Prun[i >> 2] >> ((i & 3) << 1)) & 3) - d1) % 3]
+                distFlip[n + 1] = d1
+                i = N_SLICE1 * twist[n + 1] + _slice[n + 1]
+                d2 = distTwist[n]
+                d2 += MOD3_DELTA[(((Slice_Twist_Prun[i >> 2] >> ((i & 3) << 1)) & 3) - d2) % 3]
+                distTwist[n + 1] = d2
+                minDistPhase1[n + 1] = max(d1, d2)
             # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-            if self.minDistPhase1[n + 1] == 0 and n >= depthPhase1 - 5:
-                self.minDistPhase1[n + 1] = 10  # instead of 10 any value >5 is possible
+            s = -1
+            if endgameKeys is not None and (twist[n + 1] * 2048 + flip[n + 1]) * 495 + _slice[n + 1] in endgameKeys:
+                s = self.endgameNode(n + 1, maxDepth)
+                if s >= 0:
+                    minDistPhase1[n + 1] = 99   # the maneuver is optimal from here, the subtree has no shorter one
+                    length1 = n + 1
+            if s < 0 and minDistPhase1[n + 1] == 0 and n >= depthPhase1 - 5:
+                minDistPhase1[n + 1] = 10   # instead of 10 any value >5 is possible
                 if n == depthPhase1 - 1:
-                    s = self.totalDepth(depthPhase1, maxDepth)
-                    if s >= 0:
-                        if (s == depthPhase1
-                            or (
-                                self.ax[depthPhase1 - 1] != self.ax[depthPhase1]
-                                and self.ax[depthPhase1 - 1] != self.ax[depthPhase1] + 3)):
-                            return self.solutionToString(s, depthPhase1) if useSeparator else self.solutionToString(s)
-
-    def totalDepth(self, depthPhase1, maxDepth):
+                    s = self.totalDepth(depthPhase1, maxDepth, poll)
+                    if s < -1:      # stopped in phase2
+                        if stats is not None:
+                            stats.addDepth(depthPhase1, nodes - depthNodes, depthStart, lookups)
+                        self.nodes += nodes
+                        yield s
+                        return
+                    if quantum is not None and self.nodes + nodes >= pause:
+                        pause = self.nodes + nodes + quantum
+                        yield None
+                    length1 = depthPhase1
+            if s >= 0:     # phase2 or the endgame continue the canonical maneuver of phase1
+                if stats is not None:
+                    depthStart = stats.addDepth(depthPhase1, nodes - depthNodes, depthStart, lookups)
+                    depthNodes = 0
+                self.nodes += nodes
+                nodes = 0
+                self.length = s
+                self.depthPhase1 = length1
+                newMaxDepth = yield s
+                if newMaxDepth is not None:
+                    maxDepth = newMaxDepth
+                    lastDepthPhase1 = min(lastDepthPhase1, maxDepth)
+                    if depthPhase1 > maxDepth:
+                        yield -7
+                        return
+
+    def endgameNode(self, depth, maxDepth):
+        """
+        Look the phase1 node after the moves 0 .. depth - 1 up in the endgame table. If it is inside and the maneuver
+        fits into maxDepth, it is appended to the moves and the total length returned, else -1.
+        """
+        ax = self.ax
+        po = self.po
+        URFtoDLF, FRtoBR, URtoUL, UBtoDF, parity = (self.URFtoDLF[0], self.FRtoBR[0], self.URtoUL[0], self.UBtoDF[0],
+                                                    self.parity[0])
+        for i in range(depth):
+            mv = 3 * ax[i] + po[i] - 1
+            URFtoDLF = CoordCube.URFtoDLF_MoveFlat[18 * URFtoDLF + mv]
+            FRtoBR = CoordCube.FRtoBR_MoveFlat[18 * FRtoBR + mv]
+            URtoUL = CoordCube.URtoUL_MoveFlat[18 * URtoUL + mv]
+            UBtoDF = CoordCube.UBtoDF_MoveFlat[18 * UBtoDF + mv]
+            parity = CoordCube.parityMoveFlat[18 * parity + mv]
+        found = endgame.maneuver(self.endgame, (self.twist[depth], self.flip[depth], URFtoDLF, FRtoBR, URtoUL, UBtoDF,
+                                                parity))
+        # a move of the axis of the last phase1 move would make a shorter maneuver, found by phase1 anyway
+        if found is None or depth + len(found) > maxDepth or (found and found[0] // 3 == ax[depth - 1]):
+            return -1
+        for i, mv in enumerate(found):
+            ax[depth + i] = mv // 3
+            po[depth + i] = mv % 3 + 1
+        return depth + len(found)
+
+    def totalDepth(self, depthPhase1, maxDepth, poll=None):
         """
         Apply phase2 of algorithm and return the combined phase1 and phase2 depth. In phase2, only the moves
         U,D,R2,F2,L2 and B2 are allowed.
+
+        poll - function of the phase2 nodes expanded so far which returns the negative error code to stop the search
+               with, or 0; called every 1024 nodes. The error code is then returned.
         """
 
+        ax = self.ax
+        po = self.po
+        parity = self.parity
+        URFtoDLF = self.URFtoDLF
+        FRtoBR = self.FRtoBR
+        URtoUL = self.URtoUL
+        UBtoDF = self.UBtoDF
+        URtoDF = self.URtoDF
+        minDistPhase2 = self.minDistPhase2
+        URFtoDLF_Move = CoordCube.URFtoDLF_MoveFlat
+        FRtoBR_Move = CoordCube.FRtoBR_MoveFlat
+        parityMove = CoordCube.parityMoveFlat
+        URtoDF_Move = CoordCube.URtoDF_MoveFlat
+        Slice_URFtoDLF_Parity_Prun = CoordCube.Slice_URFtoDLF_Parity_PrunTable
+        Slice_URtoDF_Parity_Prun = CoordCube.Slice_URtoDF_Parity_PrunTable
+        mod3 = isinstance(Slice_URFtoDLF_Parity_Prun, Mod3Table)
+        stats = self.stats
+        if stats is not None:
+            stats.totalDepthCalls += 1
+
         mv = 0
         d1 = 0
         d2 = 0
         maxDepthPhase2 = min(10, maxDepth - depthPhase1)    # Allow only max 10 moves in phase2
-        for i in range(depthPhase1):
-            mv = 3 * self.ax[i] + self.po[i] - 1
-            self.URFtoDLF[i + 1] = CoordCube.URFtoDLF_Move[self.URFtoDLF[i]][mv]
-            self.FRtoBR[i + 1] = CoordCube.FRtoBR_Move[self.FRtoBR[i]][mv]
-            self.parity[i + 1] = CoordCube.parityMove[self.parity[i]][mv]
-
-        d1 = getPruning(
-            CoordCube.Slice_URFtoDLF_Parity_Prun,
-            (CoordCube.N_SLICE2 * self.URFtoDLF[depthPhase1] + self.FRtoBR[depthPhase1]) * 2 + self.parity[depthPhase1]
-        )
+
+        # the coordinates are only recomputed from the first move which changed since the last call
+        replayed = self.replayed
+        start = 0
+        last = min(self.valid1, depthPhase1)
+        while start < last and replayed[start] == 3 * ax[start] + po[start] - 1:
+            start += 1
+        for i in range(start, depthPhase1):
+            mv = 3 * ax[i] + po[i] - 1
+            replayed[i] = mv
+            URFtoDLF[i + 1] = URFtoDLF_Move[18 * URFtoDLF[i] + mv]
+            FRtoBR[i + 1] = FRtoBR_Move[18 * FRtoBR[i] + mv]
+            parity[i + 1] = parityMove[18 * parity[i] + mv]
+        self.valid1 = depthPhase1   # the levels above are overwritten by phase2
+        if self.valid2 > start:
+            self.valid2 = start
+
+        d1 = (24 * URFtoDLF[depthPhase1] + FRtoBR[depthPhase1]) * 2 + parity[depthPhase1]
+        if mod3:
+            d1 = self._distance(Slice_URFtoDLF_Parity_Prun, d1, self._phase2Neighbours(URFtoDLF_Move))
+            self.distCorners[depthPhase1] = d1
+        else:
+            d1 = Slice_URFtoDLF_Parity_Prun[d1]
+            if stats is not None:
+                stats.pruningLookups += 1
         if d1 > maxDepthPhase2:
+            if stats is not None:
+                stats.d1Rejections += 1
             return -1
 
-        for i in range(depthPhase1):
-            mv = 3 * self.ax[i] + self.po[i] - 1
-            self.URtoUL[i + 1] = CoordCube.URtoUL_Move[self.URtoUL[i]][mv]
-            self.UBtoDF[i + 1] = CoordCube.UBtoDF_Move[self.UBtoDF[i]][mv]
-
-        self.URtoDF[depthPhase1] = CoordCube.MergeURtoULandUBtoDF[self.URtoUL[depthPhase1]][self.UBtoDF[depthPhase1]]
-
-        d2 = getPruning(
-            CoordCube.Slice_URtoDF_Parity_Prun,
-            (CoordCube.N_SLICE2 * self.URtoDF[depthPhase1] + self.FRtoBR[depthPhase1]) * 2 + self.parity[depthPhase1]
-        )
+        URtoUL_Move = CoordCube.URtoUL_MoveFlat
+        UBtoDF_Move = CoordCube.UBtoDF_MoveFlat
+        for i in range(self.valid2, depthPhase1):
+            mv = replayed[i]
+            URtoUL[i + 1] = URtoUL_Move[18 * URtoUL[i] + mv]
+            UBtoDF[i + 1] = UBtoDF_Move[18 * UBtoDF[i] + mv]
+        self.valid2 = depthPhase1
+
+        URtoDF[depthPhase1] = CoordCube.MergeURtoULandUBtoDFFlat[336 * URtoUL[depthPhase1] + UBtoDF[depthPhase1]]
+
+        d2 = (24 * URtoDF[depthPhase1] + FRtoBR[depthPhase1]) * 2 + parity[depthPhase1]
+        if mod3:
+            d2 = self._distance(Slice_URtoDF_Parity_Prun, d2, self._phase2Neighbours(URtoDF_Move))
+            self.distEdges[depthPhase1] = d2
+        else:
+            d2 = Slice_URtoDF_Parity_Prun[d2]
+            if stats is not None:
+                stats.pruningLookups += 1
         if d2 > maxDepthPhase2:
+            if stats is not None:
+                stats.d2Rejections += 1
             return -1
 
-        self.minDistPhase2[depthPhase1] = max(d1, d2)
-        if self.minDistPhase2[depthPhase1] == 0:    # already solved
+        minDistPhase2[depthPhase1] = max(d1, d2)
+        if minDistPhase2[depthPhase1] == 0:     # already solved
             return depthPhase1
 
+        if self.endgame is not None:
+            coords = (self.twist[depthPhase1], self.flip[depthPhase1], URFtoDLF[depthPhase1], FRtoBR[depthPhase1],
+                      URtoUL[depthPhase1], UBtoDF[depthPhase1], parity[depthPhase1])
+            found = endgame.maneuver(self.endgame, coords)
+            # a move of the axis of the last phase1 move would make a shorter maneuver, found by phase1 anyway
+            if found is not None and len(found) <= maxDepthPhase2 and found[0] // 3 != ax[depthPhase1 - 1]:
+                for i, mv in enumerate(found):
+                    ax[depthPhase1 + i] = mv // 3
+                    po[depthPhase1 + i] = mv % 3 + 1
+                return depthPhase1 + len(found)
+
+        # the result of phase2 only depends on its start coordinates and the last phase1 move
+        state = self.state
+        cache = self.phase2Cache
+        key = (((URFtoDLF[depthPhase1] * 24 + FRtoBR[depthPhase1]) * 2 + parity[depthPhase1]) * 20160
+               + URtoDF[depthPhase1]) * canonical.N_STATE + state[depthPhase1]
+        cached = cache.pop(key, None)
+        depthPhase2 = minDistPhase2[depthPhase1]     # no shorter solution exists
+        if cached is not None:
+            cache[key] = cached
+            if stats is not None:
+                stats.cacheHits += 1
+            if type(cached) is tuple:
+                if len(cached) > maxDepthPhase2:
+                    return -1
+                for i, mv in enumerate(cached):
+                    ax[depthPhase1 + i] = mv // 3
+                    po[depthPhase1 + i] = mv % 3 + 1
+                return depthPhase1 + len(cached)
+            if cached >= maxDepthPhase2:
+                return -1
+            depthPhase2 = max(depthPhase2, cached + 1)
+        elif stats is not None:
+            stats.cacheMisses += 1
+
         # now set up search
 
-        depthPhase2 = 1
+        transitions = canonical.PHASE2
+        firstAxis = canonical.FIRST_AXIS
+        DEAD = canonical.DEAD
         n = depthPhase1
         busy = False
-        self.po[depthPhase1] = 0
-        self.ax[depthPhase1] = 0
-        self.minDistPhase2[n + 1] = 1   # else failure for depthPhase2=1, n=0
+        po[depthPhase1] = 0
+        ax[depthPhase1] = firstAxis[state[depthPhase1]]
+        minDistPhase2[n + 1] = depthPhase2  # else failure for the first depthPhase2
+        nodes = 0
+        if mod3:
+            distCorners = self.distCorners
+            distEdges = self.distEdges
+            Slice_URFtoDLF_Parity_Prun = Slice_URFtoDLF_Parity_Prun.table
+            Slice_URtoDF_Parity_Prun = Slice_URtoDF_Parity_Prun.table
         # +++++++++++++++++++ end initialization +++++++++++++++++++++++++++++++++
 
         while True:
             while True:
-                if depthPhase1 + depthPhase2 - n > self.minDistPhase2[n + 1] and not busy:
-
-                    if self.ax[n] == 0 or self.ax[n] == 3:    # Initialize next move
-                        n += 1
-                        self.ax[n] = 1
-                        self.po[n] = 2
-                    else:
-                        n += 1
-                        self.ax[n] = 0
-                        self.po[n] = 1
+                if depthPhase1 + depthPhase2 - n > minDistPhase2[n + 1] and not busy:
+                    n += 1      # Initialize next move
+                    ax[n] = firstAxis[state[n]]
+                    po[n] = 1 if ax[n] == 0 else 2
                 else:
-                    if self.ax[n] == 0 or self.ax[n] == 3:
-                        self.po[n] += 1
-                        _ = (self.po[n] > 3)
+                    if ax[n] == 0 or ax[n] == 3:
+                        po[n] += 1
+                        _ = (po[n] > 3)
                     else:
-                        self.po[n] += 2
-                        _ = (self.po[n] > 3)
+                        po[n] += 2
+                        _ = (po[n] > 3)
                     if _:
                         while True:
                             # increment axis
-                            self.ax[n] += 1
-                            if self.ax[n] > 5:
+                            ax[n] += 1
+                            if ax[n] > 5:
                                 if n == depthPhase1:
                                     if depthPhase2 >= maxDepthPhase2:
+                                        self.nodes += nodes
+                                        self.cachePhase2(key, maxDepthPhase2)
+                                        if stats is not None:
+                                            stats.phase2Nodes += nodes
+                                            stats.pruningLookups += 2 * nodes
                                         return -1
                                     else:
                                         depthPhase2 += 1
-                                        self.ax[n] = 0
-                                        self.po[n] = 1
+                                        ax[n] = firstAxis[state[n]]
+                                        po[n] = 1 if ax[n] == 0 else 2
                                         busy = False
                                         break
                                 else:
@@ -273,13 +635,13 @@ class Search(object):
                                     busy = True
                                     break
                             else:
-                                if self.ax[n] == 0 or self.ax[n] == 3:
-                                    self.po[n] = 1
+                                if ax[n] == 0 or ax[n] == 3:
+                                    po[n] = 1
                                 else:
-                                    self.po[n] = 2
+                                    po[n] = 2
                                 busy = False
 
-                            if not (n != depthPhase1 and (self.ax[n - 1] == self.ax[n] or self.ax[n - 1] - 3 == self.ax[n])):
+                            if transitions[18 * state[n] + 3 * ax[n] + po[n] - 1] != DEAD:
                                 break
 
                     else:
@@ -289,30 +651,218 @@ class Search(object):
                     break
 
             # +++++++++++++ compute new coordinates and new minDist ++++++++++
-            mv = 3 * self.ax[n] + self.po[n] - 1
-
-            self.URFtoDLF[n + 1] = CoordCube.URFtoDLF_Move[self.URFtoDLF[n]][mv]
-            self.FRtoBR[n + 1] = CoordCube.FRtoBR_Move[self.FRtoBR[n]][mv]
-            self.parity[n + 1] = CoordCube.parityMove[self.parity[n]][mv]
-            self.URtoDF[n + 1] = CoordCube.URtoDF_Move[self.URtoDF[n]][mv]
-
-            self.minDistPhase2[n + 1] = max(
-                getPruning(
-                    CoordCube.Slice_URtoDF_Parity_Prun,
-                    (CoordCube.N_SLICE2 * self.URtoDF[n + 1] + self.FRtoBR[n + 1]) * 2 + self.parity[n + 1]
-                ),
-                getPruning(
-                    CoordCube.Slice_URFtoDLF_Parity_Prun,
-                    (CoordCube.N_SLICE2 * self.URFtoDLF[n + 1] + self.FRtoBR[n + 1]) * 2 + self.parity[n + 1]
+            nodes += 1
+            if nodes & 1023 == 0 and poll is not None:
+                code = poll(nodes)
+                if code:    # nothing is cached, the phase2 search is incomplete
+                    self.nodes += nodes
+                    if stats is not None:
+                        stats.phase2Nodes += nodes
+                        stats.pruningLookups += 2 * (nodes - 1)
+                    return code
+            mv = 3 * ax[n] + po[n] - 1
+            state[n + 1] = transitions[18 * state[n] + mv]
+
+            URFtoDLF[n + 1] = URFtoDLF_Move[18 * URFtoDLF[n] + mv]
+            FRtoBR[n + 1] = FRtoBR_Move[18 * FRtoBR[n] + mv]
+            parity[n + 1] = parityMove[18 * parity[n] + mv]
+            URtoDF[n + 1] = URtoDF_Move[18 * URtoDF[n] + mv]
+
+            if not mod3:
+                minDistPhase2[n + 1] = max(
+                    Slice_URtoDF_Parity_Prun[(24 * URtoDF[n + 1] + FRtoBR[n + 1]) * 2 + parity[n + 1]],
+                    Slice_URFtoDLF_Parity_Prun[(24 * URFtoDLF[n + 1] + FRtoBR[n + 1]) * 2 + parity[n + 1]]
                 )
-            )
+            else:
+                i = (24 * URtoDF[n + 1] + FRtoBR[n + 1]) * 2 + parity[n + 1]
+                d2 = distEdges[n]
+                d2 += MOD3_DELTA[(((Slice_URtoDF_Parity_Prun[i >> 2] >> ((i & 3) << 1)) & 3) - d2) % 3]
+                distEdges[n + 1] = d2
+                i = (24 * URFtoDLF[n + 1] + FRtoBR[n + 1]) * 2 + parity[n + 1]
+                d1 = distCorners[n]
+                d1 += MOD3_DELTA[(((Slice_URFtoDLF_Parity_Prun[i >> 2] >> ((i & 3) << 1)) & 3) - d1) % 3]
+                distCorners[n + 1] = d1
+                minDistPhase2[n + 1] = max(d1, d2)
             # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-            if self.minDistPhase2[n + 1] == 0:
+            if minDistPhase2[n + 1] == 0:
                 break
 
+        self.nodes += nodes
+        self.cachePhase2(key, tuple(3 * ax[i] + po[i] - 1 for i in range(depthPhase1, depthPhase1 + depthPhase2)))
+        if stats is not None:
+            stats.phase2Nodes += nodes
+            stats.pruningLookups += 2 * nodes   # every node reads both tables
         return depthPhase1 + depthPhase2
 
+    def phase1Distances(self):
+        """Exact distances of the root in Slice_Flip_Prun and Slice_Twist_Prun of the mod3 layout"""
+        N_SLICE1 = CoordCube.N_SLICE1
+        FRtoBR_Move = CoordCube.FRtoBR_MoveFlat
+
+        def neighbours(coordMove):
+            def entries(index):
+                coord, _slice = divmod(index, N_SLICE1)
+                return [N_SLICE1 * coordMove[18 * coord + mv] + FRtoBR_Move[432 * _slice + mv] // 24
+                        for mv in range(18)]
+            return entries
+
+        return (
+            self._distance(CoordCube.Slice_Flip_PrunTable, N_SLICE1 * self.flip[0] + self.slice[0],
+                           neighbours(CoordCube.flipMoveFlat)),
+            self._distance(CoordCube.Slice_Twist_PrunTable, N_SLICE1 * self.twist[0] + self.slice[0],
+                           neighbours(CoordCube.twistMoveFlat)),
+        )
+
+    def _distance(self, table, index, neighbours):
+        """Mod3Table.distance, counting the entries read in the stats"""
+        d, lookups = table.walk(index, neighbours)
+        if self.stats is not None:
+            self.stats.pruningLookups += lookups
+        return d
+
+    @staticmethod
+    def _phase2Neighbours(permMove):
+        """Neighbours of an entry (24 * perm + FRtoBR) * 2 + parity of a phase2 pruning table in the phase2 moves"""
+        FRtoBR_Move = CoordCube.FRtoBR_MoveFlat
+        parityMove = CoordCube.parityMoveFlat
+
+        def entries(index):
+            parity = index & 1
+            perm, _slice = divmod(index >> 1, 24)
+            return [(24 * permMove[18 * perm + mv] + FRtoBR_Move[18 * _slice + mv]) * 2 + parityMove[18 * parity + mv]
+                    for mv in (0, 1, 2, 4, 7, 9, 10, 11, 13, 16)]
+        return entries
+
+    def cachePhase2(self, key, value):
+        """Store the phase2 result for key, dropping the least recently used entries above phase2CacheSize."""
+        cache = self.phase2Cache
+        self.phase2CacheBytes += sys.getsizeof(key) + sys.getsizeof(value)
+        old = cache.pop(key, None)
+        if old is not None:
+            self.phase2CacheBytes -= sys.getsizeof(key) + sys.getsizeof(old)
+        cache[key] = value
+        while len(cache) > self.phase2CacheSize:
+            k, v = cache.popitem(last=False)
+            self.phase2CacheBytes -= sys.getsizeof(k) + sys.getsizeof(v)
+        if self.stats is not None:
+            self.cacheStats(self.stats)
+
+    def cacheStats(self, stats):
+        """Set the size of phase2Cache in stats."""
+        stats.cacheEntries = len(self.phase2Cache)
+        stats.cacheBytes = sys.getsizeof(self.phase2Cache) + self.phase2CacheBytes
+
+
+class SearchTask(object):
+    """
+    A solve as a resumable object for cooperative scheduling. Each step() searches about `quantum` nodes and returns,
+    so the caller decides when to continue; result holds the solution string, or the error string like
+    Search.solution, when done. A phase2 search is not interrupted by the quantum, so a step can take one phase2
+    search longer; the timeout, the node budget and the token are also checked within phase2. The timeout counts wall
+    time, including the time between the steps.
+
+        task = SearchTask(Search(), facelets, maxNodes=10 ** 7)
+        while not task.step():
+            ...     # serve other work, task.cancel() to give up
+    """
+
+    def __init__(self, search, facelets, maxDepth=24, timeOut=1000, maxNodes=None, quantum=10000, token=None,
+                 useSeparator=False):
+        """
+        search - the Search object to run, used by the task until it is done or closed
+        maxNodes - node budget, exceeding it is handled like a timeout
+        token - CancelToken of the task, a new one by default
+        """
+        self.search = search
+        self.token = token if token is not None else CancelToken()
+        self.useSeparator = useSeparator
+        self.result = None
+        self._run = None
+        s = search.prepare(facelets)
+        if s != 0:
+            self.result = "Error %s" % abs(s)
+        else:
+            self._run = search._run(maxDepth, timeOut, 1, None, None, self.token, maxNodes, quantum)
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    def step(self):
+        """Search for one quantum of nodes. Returns True when the search is done."""
+        if self.result is None:
+            s = next(self._run)
+            if s is not None:
+                self.close()
+                if s < 0:
+                    self.result = "Error %s" % abs(s)
+                elif self.useSeparator:
+                    self.result = self.search.solutionToString(s, self.search.depthPhase1)
+                else:
+                    self.result = self.search.solutionToString(s)
+        return self.result is not None
+
+    def cancel(self):
+        """Stop the search at the next step, the result is then Error 9."""
+        self.token.cancel()
+
+    def close(self):
+        """Release the search, e.g. when the task is abandoned before it is done."""
+        if self._run is not None:
+            self._run.close()
+            self._run = None
+
+
+class SearchStats(object):
+    """Counters of the searches of a Search object, collected while it is set as Search.stats."""
+
+    def __init__(self):
+        self.phase1Nodes = {}       # depthPhase1 -> phase1 nodes expanded in that iteration of the IDA*
+        self.depthTime = {}         # depthPhase1 -> wall time of that iteration in seconds, phase2 included
+        self.totalDepthCalls = 0    # phase1 maneuvers reaching the H subgroup which were handed to phase2
+        self.d1Rejections = 0       # ... rejected by the URFtoDLF pruning value before searching phase2
+        self.d2Rejections = 0       # ... rejected by the URtoDF pruning value
+        self.phase2Nodes = 0
+        self.pruningLookups = 0     # pruning table entries read, the walks of the mod3 layout included
+        self.cacheHits = 0          # phase2 starts answered by Search.phase2Cache
+        self.cacheMisses = 0
+        self.cacheEntries = 0       # size of the cache and an estimate of its memory in bytes
+        self.cacheBytes = 0
+        self.lastLayer = False      # the cube was answered from the table of lastlayer without a search
+        self.cached = False         # the solution was taken from a SolutionCache without a search
+
+    def addDepth(self, depthPhase1, nodes, start, lookups):
+        """
+        Add nodes, reading `lookups` pruning table entries each, and the time since start to the iteration depthPhase1.
+        Returns the current time.
+        """
+        now = time.time()
+        self.pruningLookups += lookups * nodes
+        self.phase1Nodes[depthPhase1] = self.phase1Nodes.get(depthPhase1, 0) + nodes
+        self.depthTime[depthPhase1] = self.depthTime.get(depthPhase1, 0.0) + now - start
+        return now
+
+    @property
+    def cacheHitRate(self):
+        lookups = self.cacheHits + self.cacheMisses
+        return float(self.cacheHits) / lookups if lookups else 0.0
+
+    def __str__(self):
+        if self.lastLayer:
+            return 'answered by the last layer table'
+        if self.cached:
+            return 'answered by the solution cache'
+        lines = ['depth  phase1 nodes     time']
+        for d in sorted(self.phase1Nodes):
+            lines.append('%5d %13d %8.3f' % (d, self.phase1Nodes[d], self.depthTime[d]))
+        lines.append('phase2 starts %d, rejected by d1 %d, by d2 %d' % (
+            self.totalDepthCalls, self.d1Rejections, self.d2Rejections))
+        lines.append('phase2 nodes %d, pruning lookups %d' % (self.phase2Nodes, self.pruningLookups))
+        lines.append('phase2 cache hit rate %.1f%% (%d hits), %d entries, %d bytes' % (
+            100 * self.cacheHitRate, self.cacheHits, self.cacheEntries, self.cacheBytes))
+        return '\n'.join(lines)
+
 def patternize(facelets, pattern):
     facelets_cc = FaceCube(facelets).toCubieCube()
     patternized_cc = CubieCube()
@@ -0,0 +1,249 @@
+"""
+In-process solver API.
+
+solve() runs the Two-Phase-Algorithm of Search in the calling process. Search objects are kept in a pool and reused,
+and the tables of CoordCube stay loaded for the lifetime of the process, so many cubes can be solved per second.
+solve_many() fans a stream of cubes out to a process pool sharing one copy of the tables.
+
+    >>> import pykociemba
+    >>> s = pykociemba.solve('DUUBULDBFRBFRRULLLBRDFFFBLURDBFDFDRFRULBLUFDURRBLBDUDL')
+    >>> str(s), s.phase1, s.phase2
+    ("D2 L' D' L2 U R2 F B L B D' B2 R2 U' R2 U' F2 R2 U' L2", 10, 10)
+
+The tables are only loaded on the first solve, importing this module is cheap.
+"""
+import multiprocessing
+import threading
+import time
+
+from .cancel import CancelToken  # noqa: F401, re-exported
+
+
+class SolveError(ValueError):
+    """A cube which can not be solved, with the error code of Search.solution."""
+
+    messages = {
+        1: 'There is not exactly one facelet of each colour',
+        2: 'Not all 12 edges exist exactly once',
+        3: 'Flip error: One edge has to be flipped',
+        4: 'Not all corners exist exactly once',
+        5: 'Twist error: One corner has to be twisted',
+        6: 'Parity error: Two corners or two edges have to be exchanged',
+        7: 'No solution exists for the given maxDepth',
+        8: 'Timeout, no solution within given time',
+        9: 'Cancelled',
+    }
+
+    def __init__(self, code):
+        super(SolveError, self).__init__('Error %d: %s' % (code, self.messages.get(code, 'unknown error')))
+        self.code = code
+
+    def __reduce__(self):
+        return SolveError, (self.code,)
+
+
+class Solution(object):
+    """A solution found by solve()."""
+
+    def __init__(self, moves, phase1, nodes, elapsed, stats=None):
+        self.moves = moves      # list of moves, e.g. ["R", "U2", "F'"]
+        self.phase1 = phase1    # number of moves of phase1
+        self.nodes = nodes      # nodes expanded by the search
+        self.elapsed = elapsed  # time spent in the search in seconds
+        self.stats = stats      # SearchStats of the search if requested
+
+    @property
+    def phase2(self):
+        """Number of moves of phase2"""
+        return len(self.moves) - self.phase1
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __str__(self):
+        return ' '.join(self.moves)
+
+    def __repr__(self):
+        return '<Solution %r (%d+%d moves, %d nodes, %.3f s)>' % (
+            str(self), self.phase1, self.phase2, self.nodes, self.elapsed)
+
+
+_idle = []  # Search objects not in use
+_lock = threading.Lock()
+
+
+def _acquire():
+    with _lock:
+        if _idle:
+            return _idle.pop()
+    from .search import Search
+
+    return Search()
+
+
+def _release(search):
+    with _lock:
+        _idle.append(search)
+
+
+def warm_up(searches=1):
+    """Load the tables and put `searches` Search objects in the pool ahead of the first solve."""
+    from .search import Search
+
+    with _lock:
+        while len(_idle) < searches:
+            _idle.append(Search())
+
+
+def solve(facelets, max_depth=24, timeout=1000, stats=False, cache=None, endgame=None):
+    """
+    Solve the cube given by the facelet string, see Search.solution. Raises SolveError if there is no solution.
+
+    max_depth - maximal length of the solution
+    timeout - maximal computing time in seconds
+    stats - collect the SearchStats of the search in Solution.stats
+    cache - SolutionCache to look the solution up in first and to store it in. With a symmetric cache, the
+            solution is the one of the representative of the cube mapped back; phase1 then counts the moves of the
+            first part, which is the inverted phase2 if the representative is the inverse. The stats of a solution
+            taken from the cache only have SearchStats.cached set.
+    endgame - radius of the endgame table the cube is looked up in first, see Search.useEndgame; a cube up to
+              endgame + 2 moves from solved gets an optimal solution without a search
+
+    A cube with only the pieces of one layer unsolved is answered from the table of lastlayer, once it is built, with
+    phase1 counting all of its moves. Its stats then only have SearchStats.lastLayer set.
+    """
+    if cache is not None:
+        t = time.time()
+        key, transform = cache.canonical(facelets)
+        cached = cache.get(key, max_depth, endgame)
+        if cached is not None:
+            sol = Solution(cached[0], cached[1], 0, 0.0)
+            if stats:
+                from .search import SearchStats
+
+                sol.stats = SearchStats()
+                sol.stats.cached = True
+        else:
+            sol = solve(key, max_depth, timeout, stats, endgame=endgame)
+            cache.put(key, max_depth, sol.moves, sol.phase1, endgame)
+        if transform is not None:
+            sol.moves, sol.phase1 = transform(sol.moves, sol.phase1)
+        sol.elapsed = time.time() - t
+        return sol
+
+    from .lastlayer import lookup
+
+    t = time.time()
+    moves = lookup(facelets)
+    if moves is not None and len(moves) <= max_depth:
+        sol = Solution(moves, len(moves), 0, time.time() - t)
+        if stats:
+            from .search import SearchStats
+
+            sol.stats = SearchStats()
+            sol.stats.lastLayer = True
+        return sol
+
+    search = _acquire()
+    try:
+        if stats:
+            from .search import SearchStats
+
+            search.stats = SearchStats()
+        search.useEndgame(endgame or 0)
+        t = time.time()
+        res = search.solution(facelets, max_depth, timeout, False)
+        elapsed = time.time() - t
+        if res.startswith('Error'):
+            raise SolveError(int(res.split()[1]))
+        return Solution(search.moves(), search.depthPhase1, search.nodes, elapsed, search.stats)
+    finally:
+        search.stats = None
+        search.useEndgame(0)
+        _release(search)
+
+
+def solve_anytime(facelets, max_depth=24, timeout=10, max_nodes=None):
+    """
+    Anytime solve: yields a Solution as soon as one is found, then every strictly shorter Solution the search finds,
+    until no shorter one exists within max_depth or the timeout (seconds) or the node budget max_nodes runs out. The
+    caller can stop iterating at any deadline and keep the last Solution. nodes and elapsed are counted from the
+    start. Raises SolveError if the cube is invalid or no solution is found at all.
+    """
+    search = _acquire()
+    try:
+        t = time.time()
+        for res in search.solutions(facelets, max_depth, timeout, False, max_nodes):
+            if res.startswith('Error'):
+                raise SolveError(int(res.split()[1]))
+            yield Solution(search.moves(), search.depthPhase1, search.nodes, time.time() - t)
+    finally:
+        _release(search)
+
+
+async def solve_async(facelets, max_depth=24, timeout=1000, max_nodes=None, quantum=10000, token=None):
+    """
+    Coroutine version of solve for event loops. The search runs in the thread of the loop, `quantum` nodes at a time,
+    and yields to the loop in between, so many solves share one loop in turns; a turn can run over by the rest of one
+    phase2 search. Cancelling the awaiting task stops the search between two turns. Cancelling the CancelToken `token`,
+    also from another thread, stops it within about 1024 nodes, in phase2 too, and raises SolveError 9. The timeout
+    counts wall time, so it includes the turns of the other solves.
+
+        solutions = await asyncio.gather(*(pykociemba.solve_async(f, max_nodes=10 ** 7) for f in cubes))
+    """
+    import asyncio
+
+    from .search import SearchTask
+
+    search = _acquire()
+    task = None
+    try:
+        t = time.time()
+        task = SearchTask(search, facelets, max_depth, timeout, max_nodes, quantum, token)
+        while not task.step():
+            await asyncio.sleep(0)
+        if task.result.startswith('Error'):
+            raise SolveError(int(task.result.split()[1]))
+        return Solution(search.moves(), search.depthPhase1, search.nodes, time.time() - t)
+    finally:
+        if task is not None:
+            task.close()
+        _release(search)
+
+
+def _solve_item(item):
+    index, facelets, max_depth, timeout = item
+    try:
+        return index, solve(facelets, max_depth, timeout)
+    except SolveError as e:
+        return index, e
+
+
+def solve_many(cubes, workers=None, chunk=16, ordered=True, max_depth=24, timeout=1000):
+    """
+    Solve an iterable of facelet strings with a pool of `workers` processes (all cores by default).
+
+    Yields (index, result) pairs as soon as they are available, in input order if `ordered`, else in completion order.
+    result is a Solution or the SolveError of that cube, so a cube running into its timeout does not stop the others.
+    Cubes are sent to the workers in chunks of `chunk`. The workers share the tables through a TableStore.
+    """
+    items = ((i, f, max_depth, timeout) for i, f in enumerate(cubes))
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1:
+        for item in items:
+            yield _solve_item(item)
+        return
+
+    from .tablestore import TableStore, shared_memory
+
+    store = TableStore.publish() if shared_memory is not None else None
+    pool = store.pool(workers) if store is not None else multiprocessing.Pool(workers)
+    try:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for res in imap(_solve_item, items, chunk):
+            yield res
+    finally:
+        pool.terminate()
+        pool.join()
+        if store is not None:
+            store.close()
@@ -0,0 +1,164 @@
+"""
+Symmetries of the cube on the cubie level.
+
+A symmetry S is a CubieCube describing a rotation or reflection of the whole cube. The conjugate S^-1 * C * S of a cube
+C is the same cube seen from another side, a maneuver m1 ... mk solving it maps back to the maneuver solving C by
+replacing every move m with S * m * S^-1, which again is a face move. Reflections describe the mirrored corners by
+the orientations 3, 4 and 5, see CubieCube.cornerMultiply.
+"""
+from builtins import range
+
+from .corner import URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB
+from .cubiecube import CubieCube, moveCube
+from .edge import UR, UF, UL, UB, DR, DF, DL, DB, FR, FL, BL, BR
+
+# 120 degree clockwise rotation around the long diagonal URF-DBL
+ROT_URF3 = CubieCube(
+    cp=[URF, DFR, DLF, UFL, UBR, DRB, DBL, ULB],
+    co=[1, 2, 1, 2, 2, 1, 2, 1],
+    ep=[UF, FR, DF, FL, UB, BR, DB, BL, UR, DR, DL, UL],
+    eo=[1, 0, 1, 0, 1, 0, 1, 0, 1, 1, 1, 1],
+)
+
+# 180 degree rotation around the axis through the F and B centers
+ROT_F2 = CubieCube(
+    cp=[DLF, DFR, DRB, DBL, UFL, URF, UBR, ULB],
+    co=[0, 0, 0, 0, 0, 0, 0, 0],
+    ep=[DL, DF, DR, DB, UL, UF, UR, UB, FL, FR, BR, BL],
+    eo=[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+)
+
+# 90 degree clockwise rotation around the axis through the U and D centers
+ROT_U4 = CubieCube(
+    cp=[UBR, URF, UFL, ULB, DRB, DFR, DLF, DBL],
+    co=[0, 0, 0, 0, 0, 0, 0, 0],
+    ep=[UB, UR, UF, UL, DB, DR, DF, DL, BR, FR, FL, BL],
+    eo=[0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1],
+)
+
+# reflection at the plane through the U, D, F and B centers
+MIRR_LR2 = CubieCube(
+    cp=[UFL, URF, UBR, ULB, DLF, DFR, DRB, DBL],
+    co=[3, 3, 3, 3, 3, 3, 3, 3],
+    ep=[UL, UF, UR, UB, DL, DF, DR, DB, FL, FR, BR, BL],
+    eo=[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+)
+
+
+def inverse(c):
+    """The inverse of the CubieCube c"""
+    ret = CubieCube()
+    c.invCubieCube(ret)
+    return ret
+
+
+def product(*cubes):
+    """The product of the CubieCubes, from left to right"""
+    ret = CubieCube()
+    for c in cubes:
+        ret.multiply(c)
+    return ret
+
+
+def power(c, n):
+    """c^n for n >= 0"""
+    return product(*([c] * n))
+
+
+def conjugate(c, s):
+    """S^-1 * c * S"""
+    return product(inverse(s), c, s)
+
+
+def _move_cubes():
+    cubes = []
+    for ax in range(6):
+        c = CubieCube()
+        for _ in range(3):
+            c = product(c, moveCube[ax])
+            cubes.append(c)
+    return cubes
+
+
+def _key(c):
+    return tuple(c.cp), tuple(c.co), tuple(c.ep), tuple(c.eo)
+
+
+moves = _move_cubes()   # the 18 moves 3 * axis + power - 1 as CubieCubes
+_moveIndex = dict((_key(c), mv) for mv, c in enumerate(moves))
+
+
+def conjugate_moves(s):
+    """The table mv -> S * mv * S^-1 which maps the moves of a solution of S^-1 * C * S to a solution of C."""
+    sInv = inverse(s)
+    return [_moveIndex[_key(product(s, m, sInv))] for m in moves]
+
+
+def inverse_move(mv):
+    """The move undoing mv"""
+    return mv - mv % 3 + 2 - mv % 3
+
+
+def _symmetries():
+    cubes = []
+    c = CubieCube()
+    for urf3 in range(3):
+        for f2 in range(2):
+            for u4 in range(4):
+                for lr2 in range(2):
+                    cubes.append(product(c))
+                    c.multiply(MIRR_LR2)
+                c.multiply(ROT_U4)
+            c.multiply(ROT_F2)
+        c.multiply(ROT_URF3)
+    return cubes
+
+
+# the 48 symmetries of the cube, index 16 * urf3 + 8 * f2 + 2 * u4 + lr2
+symCube = _symmetries()
+symInv = [inverse(s) for s in symCube]
+_symMoves = [None] * len(symCube)
+
+
+def sym_moves(idx):
+    """conjugate_moves of the symmetry symCube[idx]"""
+    if _symMoves[idx] is None:
+        _symMoves[idx] = conjugate_moves(symCube[idx])
+    return _symMoves[idx]
+
+
+def canonical(cc):
+    """
+    The representative of the class of cc under the 48 symmetries and inversion, which is the smallest of the cubes
+    S^-1 * cc * S and S^-1 * cc^-1 * S. Returns (representative, move table, inverted), see map_solution for the
+    mapping of a solution of the representative back to cc.
+    """
+    best = None
+    for inverted, c in ((False, cc), (True, inverse(cc))):
+        for idx in range(len(symCube)):
+            d = product(symInv[idx], c, symCube[idx])
+            key = _key(d)
+            if best is None or key < best[0]:
+                best = key, d, idx, inverted
+    _, d, idx, inverted = best
+    return d, sym_moves(idx), inverted
+
+
+move_names = [ax + po for ax in 'URFDLB' for po in ('', '2', "'")]     # names of the moves 3 * axis + power - 1
+_moveNumbers = dict((name, mv) for mv, name in enumerate(move_names))
+
+
+def map_names(moves, table, inverted):
+    """map_solution for a list of move names, e.g. ["R", "U2", "F'"]"""
+    return [move_names[mv] for mv in map_solution([_moveNumbers[m] for m in moves], table, inverted)]
+
+
+def map_solution(moves, table, inverted):
+    """
+    Map the moves (3 * axis + power - 1) of a solution of S^-1 * C * S back to a solution of C by the move table of S.
+    If the cube was inverted (S^-1 * C^-1 * S), the solution is also inverted and reversed.
+    """
+    moves = [table[mv] for mv in moves]
+    if inverted:
+        moves = [inverse_move(mv) for mv in reversed(moves)]
+    return moves
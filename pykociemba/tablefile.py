@@ -0,0 +1,155 @@
+"""
+Versioned binary format for the move and pruning tables.
+
+A table file is a 16 byte header followed by the raw little-endian entries of the table:
+
+    magic     4s  b'PKCT'
+    version   H   TABLE_FORMAT_VERSION
+    typecode  c   array typecode of the entries ('b', 'B', 'h', 'H', 'i' or 'I')
+    (pad)     x
+    rows      I   number of rows, or 0 for a one-dimensional table
+    cols      I   number of entries per row, or the length of a one-dimensional table
+
+Tables are opened with mmap, so loading one costs next to nothing and its pages are shared between processes through
+the OS page cache. Run `python -m pykociemba.tablefile` to convert the pickled tables of prunetables/ once.
+"""
+from builtins import range
+import array
+import logging
+import mmap
+import os
+import struct
+import sys
+
+try:
+    import cPickle
+except ImportError:
+    import pickle as cPickle
+
+log = logging.getLogger(__name__)
+
+cache_dir = os.path.join(os.path.dirname(__file__), 'prunetables')
+
+TABLE_MAGIC = b'PKCT'
+TABLE_FORMAT_VERSION = 1
+TABLE_SUFFIX = '.bin'
+
+_header = struct.Struct('<4sHcxII')
+
+# smallest typecode first
+_typecode_ranges = (
+    ('B', 0, 0xff),
+    ('b', -0x80, 0x7f),
+    ('H', 0, 0xffff),
+    ('h', -0x8000, 0x7fff),
+    ('I', 0, 0xffffffff),
+    ('i', -0x80000000, 0x7fffffff),
+)
+
+
+def table_path(name, directory=None):
+    return os.path.join(directory or cache_dir, name + TABLE_SUFFIX)
+
+
+def flatten(table):
+    """Return (rows, cols, entries) for a list of rows or a flat sequence."""
+    if len(table) and hasattr(table[0], '__len__'):
+        cols = len(table[0])
+        entries = [v for row in table for v in row]
+        return len(table), cols, entries
+    return 0, len(table), table
+
+
+def typecode_for(entries):
+    """Smallest array typecode able to hold all entries."""
+    lo = min(entries) if len(entries) else 0
+    hi = max(entries) if len(entries) else 0
+    for typecode, tmin, tmax in _typecode_ranges:
+        if tmin <= lo and hi <= tmax:
+            return typecode
+    raise ValueError('table entries out of range: %s..%s' % (lo, hi))
+
+
+def pack_table(table, typecode=None):
+    """Serialize a table (list of rows or flat sequence) to the binary format."""
+    rows, cols, entries = flatten(table)
+    typecode = typecode or typecode_for(entries)
+    data = array.array(typecode, entries)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    header = _header.pack(TABLE_MAGIC, TABLE_FORMAT_VERSION, typecode.encode('ascii'), rows, cols)
+    return header + data.tobytes()
+
+
+def unpack_table(buf, offset=0):
+    """
+    Parse a table from a buffer in the binary format without copying it.
+
+    Returns (flat, rows, cols) where flat is a one-dimensional memoryview of the entries.
+    """
+    buf = memoryview(buf)
+    magic, version, typecode, rows, cols = _header.unpack_from(buf, offset)
+    if magic != TABLE_MAGIC:
+        raise ValueError('not a table file')
+    if version != TABLE_FORMAT_VERSION:
+        raise ValueError('unsupported table format version %s' % version)
+    typecode = typecode.decode('ascii')
+    count = (rows or 1) * cols
+    start = offset + _header.size
+    size = count * array.array(typecode).itemsize
+    if len(buf) < start + size:
+        raise ValueError('truncated table')
+    flat = buf[start:start + size].cast('B').cast(typecode)
+    if sys.byteorder != 'little':
+        data = array.array(typecode, flat)
+        data.byteswap()
+        flat = memoryview(data)
+    return flat, rows, cols
+
+
+def as_rows(flat, rows, cols):
+    """Row views over a flat table, indexable like the original list of lists."""
+    if not rows:
+        return flat
+    return [flat[i * cols:(i + 1) * cols] for i in range(rows)]
+
+
+def write_table(table, path, typecode=None):
+    """Atomically write a table to path."""
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(pack_table(table, typecode))
+    os.replace(tmp, path)
+
+
+def map_table(path):
+    """Memory-map a table file. Returns (flat, rows, cols) like unpack_table."""
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return unpack_table(mm)
+
+
+def read_table(path):
+    """Memory-map a table file and return it as rows (or flat for one-dimensional tables)."""
+    return as_rows(*map_table(path))
+
+
+def convert_pickles(directory=None):
+    """Convert every pickled table of directory to the binary format. Returns the converted table names."""
+    directory = directory or cache_dir
+    converted = []
+    for filename in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.pkl':
+            continue
+        with open(os.path.join(directory, filename), 'rb') as f:
+            table = cPickle.load(f)
+        write_table(table, table_path(name, directory))
+        log.info('converted %s', name)
+        converted.append(name)
+    return converted
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    convert_pickles(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,309 @@
+"""
+NumPy generators for the tables of CoordCube.
+
+The move tables are built by decoding every coordinate of a kind once into a matrix of cubie permutations and
+orientations, applying the six face turns as column gathers and encoding all resulting cubes in bulk. The pruning
+tables are filled with a breadth-first search that expands a whole depth layer at once, gathering the neighbours of
+every frontier entry from the move tables. The result is byte-identical to the entry-by-entry loops of coordcube, but
+takes seconds instead of hours. numpy is imported lazily so that loading cached tables never pays for it.
+"""
+from builtins import range
+import logging
+import os
+
+from .corner import DLF
+from .cubiecube import CubieCube, Cnk, moveCube
+from .edge import UR, UL, UB, DF, FR, BR
+
+log = logging.getLogger(__name__)
+
+UNSET = 0x0f
+
+# moves allowed in phase2: U, U2, U', R2, F2, D, D2, D', L2, B2
+PHASE2_MOVES = (0, 1, 2, 4, 7, 9, 10, 11, 13, 16)
+ALL_MOVES = tuple(range(18))
+
+# parity of the corner permutation after each move, CoordCube.parityMove
+PARITY_MOVE = [
+    [1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 1],
+    [0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0],
+]
+
+
+def available():
+    """True if numpy can be imported."""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def as_array(table):
+    """Convert a move table (list of rows or row views) to a 2D numpy array."""
+    import numpy as np
+
+    return np.array([list(row) for row in table], dtype=np.int64)
+
+
+def save_checkpoint(path, dist, depth):
+    """Atomically save the distances of a breadth-first search after the layer depth."""
+    import numpy as np
+
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        np.save(f, np.append(dist, np.uint8(depth)))
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path, size):
+    """(dist, depth) saved by save_checkpoint for a search over size entries, None if there is no usable one."""
+    import numpy as np
+
+    try:
+        with open(path, 'rb') as f:
+            data = np.load(f)
+    except (IOError, OSError, ValueError) as e:
+        log.debug('no checkpoint %s: %s', path, e)
+        return None
+    if len(data) != size + 1:
+        log.warning('ignoring checkpoint %s of another table', path)
+        return None
+    return data[:-1].copy(), int(data[-1])
+
+
+def bfs(size, neighbour, moves, checkpoint=None, progress=None):
+    """
+    Distance of every index to index 0, one entry per byte.
+
+    size - number of entries
+    neighbour - function (indices, move) -> indices, vectorized over a numpy array of indices
+    moves - moves to expand
+    checkpoint - file to save the distances to after every layer and to resume from
+    progress - function (depth, done, size) called after every layer
+    """
+    import numpy as np
+
+    saved = load_checkpoint(checkpoint, size) if checkpoint else None
+    if saved is not None:
+        dist, depth = saved
+        log.info('resuming %s at depth %d', checkpoint, depth)
+    else:
+        dist = np.full(size, UNSET, dtype=np.uint8)
+        dist[0] = 0
+        depth = 0
+    done = size - int(np.count_nonzero(dist == UNSET))
+    while done != size:
+        frontier = np.flatnonzero(dist == depth)
+        if not len(frontier):
+            raise ValueError('%d entries are unreachable' % (size - done))
+        for mv in moves:
+            nb = neighbour(frontier, mv)
+            nb = nb[dist[nb] == UNSET]
+            dist[nb] = depth + 1
+        done = size - int(np.count_nonzero(dist == UNSET))
+        depth += 1
+        log.debug('depth %d: %d of %d entries done', depth, done, size)
+        if checkpoint:
+            save_checkpoint(checkpoint, dist, depth)
+        if progress is not None:
+            progress(depth, done, size)
+    return dist
+
+
+def pack_nibbles(dist):
+    """Pack two pruning values in one byte the way coordcube.setPruning does."""
+    import numpy as np
+
+    if len(dist) % 2:
+        dist = np.append(dist, np.uint8(UNSET))
+    return bytearray((dist[0::2] | (dist[1::2] << 4)).tobytes())
+
+
+def phase2_pruning(permMove, FRtoBR_Move, parityMove, n_perm, n_slice2=24, **kwargs):
+    """
+    Pruning table for (n_perm * N_SLICE2 + slice) * 2 + parity in phase2, where permMove is URFtoDLF_Move or
+    URtoDF_Move. The keyword arguments are passed to bfs.
+    """
+    import numpy as np
+
+    perm_move = as_array(permMove[:n_perm])
+    slice_move = as_array(FRtoBR_Move[:n_slice2])
+    parity_move = np.array(parityMove, dtype=np.int64)
+
+    def neighbour(i, mv):
+        parity = i % 2
+        perm = (i // 2) // n_slice2
+        _slice = (i // 2) % n_slice2
+        return (n_slice2 * perm_move[perm, mv] + slice_move[_slice, mv]) * 2 + parity_move[parity, mv]
+
+    return pack_nibbles(bfs(n_slice2 * n_perm * 2, neighbour, PHASE2_MOVES, **kwargs))
+
+
+def phase1_pruning(coordMove, FRtoBR_Move, n_coord, n_slice1=495, **kwargs):
+    """
+    Pruning table for n_slice1 * coord + slice in phase1, where coordMove is twistMove or flipMove. The keyword
+    arguments are passed to bfs.
+    """
+    coord_move = as_array(coordMove)
+    slice_move = as_array(FRtoBR_Move[::24][:n_slice1]) // 24
+
+    def neighbour(i, mv):
+        return n_slice1 * coord_move[i // n_slice1, mv] + slice_move[i % n_slice1, mv]
+
+    return pack_nibbles(bfs(n_slice1 * n_coord, neighbour, ALL_MOVES, **kwargs))
+
+
+# ++++++++++++++++++++++++++++++++++++++++ move tables ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+
+def _cnk_table(n, k):
+    import numpy as np
+
+    return np.array([[Cnk(i, j) for j in range(k + 1)] for i in range(n)], dtype=np.int64)
+
+
+def encode_orientation(ori, base):
+    """Vectorized getTwist (base 3) and getFlip (base 2): all but the last cubie in base `base`."""
+    ret = ori[:, 0] * 0
+    for i in range(ori.shape[1] - 1):
+        ret = base * ret + ori[:, i]
+    return ret
+
+
+def encode_permutation(perm, lo, hi, descending=False):
+    """
+    Vectorized version of the permutation coordinates of CubieCube (getURFtoDLF, getFRtoBR, ...).
+
+    The cubies lo..hi are ranked by the combination of their positions and by the permutation among them.
+    descending selects the position order of getFRtoBR, which ranks the positions from the last one.
+    """
+    import numpy as np
+
+    count, length = perm.shape
+    k = hi - lo + 1
+    cnk = _cnk_table(length, k)
+    member = (lo <= perm) & (perm <= hi)
+    rows = np.arange(count)
+
+    # combination of the positions
+    a = np.zeros(count, dtype=np.int64)
+    x = np.zeros(count, dtype=np.int64)
+    positions = range(length - 1, -1, -1) if descending else range(length)
+    for j in positions:
+        m = member[:, j]
+        a += np.where(m, cnk[length - 1 - j if descending else j][np.minimum(x + 1, k)], 0)
+        x += m
+
+    # the member cubies in position order, renumbered 0..k-1
+    order = np.argsort(~member, axis=1, kind='stable')[:, :k]
+    arr = perm[rows[:, None], order] - lo
+
+    # permutation: number of left rotations of arr[0..j] which bring cubie j to position j
+    b = np.zeros(count, dtype=np.int64)
+    for j in range(k - 1, 0, -1):
+        p = np.argmax(arr[:, :j + 1] == j, axis=1)
+        steps = (p + 1) % (j + 1)
+        idx = (np.arange(j + 1)[None, :] + steps[:, None]) % (j + 1)
+        arr[:, :j + 1] = arr[rows[:, None], idx]
+        b = (j + 1) * b + steps
+    return a, b
+
+
+def _encode_twist(cp, co):
+    return encode_orientation(co, 3)
+
+
+def _encode_flip(ep, eo):
+    return encode_orientation(eo, 2)
+
+
+def _encode_URFtoDLF(cp, co):
+    a, b = encode_permutation(cp, 0, DLF)
+    return 720 * a + b
+
+
+def _encode_FRtoBR(ep, eo):
+    a, b = encode_permutation(ep, FR, BR, descending=True)
+    return 24 * a + b
+
+
+def _encode_URtoDF(ep, eo):
+    a, b = encode_permutation(ep, UR, DF)
+    return 720 * a + b
+
+
+def _encode_URtoUL(ep, eo):
+    a, b = encode_permutation(ep, UR, UL)
+    return 6 * a + b
+
+
+def _encode_UBtoDF(ep, eo):
+    a, b = encode_permutation(ep, UB, DF)
+    return 6 * a + b
+
+
+# coordinate -> (setter of CubieCube, True for a corner coordinate, vectorized getter)
+COORDINATES = {
+    'twist': (CubieCube.setTwist, True, _encode_twist),
+    'flip': (CubieCube.setFlip, False, _encode_flip),
+    'FRtoBR': (CubieCube.setFRtoBR, False, _encode_FRtoBR),
+    'URFtoDLF': (CubieCube.setURFtoDLF, True, _encode_URFtoDLF),
+    'URtoDF': (CubieCube.setURtoDF, False, _encode_URtoDF),
+    'URtoUL': (CubieCube.setURtoUL, False, _encode_URtoUL),
+    'UBtoDF': (CubieCube.setUBtoDF, False, _encode_UBtoDF),
+}
+
+
+def decode(coord, n):
+    """Permutation and orientation matrices of the cubes with coordinate 0..n-1 (corners or edges)."""
+    import numpy as np
+
+    setter, corners, _ = COORDINATES[coord]
+    perm = []
+    ori = []
+    for i in range(n):
+        a = CubieCube()
+        setter(a, i)
+        perm.append(a.cp if corners else a.ep)
+        ori.append(a.co if corners else a.eo)
+    return np.array(perm, dtype=np.int64), np.array(ori, dtype=np.int64)
+
+
+def multiply(perm, ori, b, corners):
+    """Vectorized cornerMultiply/edgeMultiply of every row with the regular CubieCube b."""
+    import numpy as np
+
+    bp = np.array(b.cp if corners else b.ep)
+    bo = np.array(b.co if corners else b.eo)
+    return perm[:, bp], (ori[:, bp] + bo) % (3 if corners else 2)
+
+
+def move_table(coord, n, n_move=18):
+    """Move table [n][N_MOVE] of a coordinate, identical to the one built with CubieCube in coordcube."""
+    import numpy as np
+
+    _, corners, encode = COORDINATES[coord]
+    perm, ori = decode(coord, n)
+    table = np.zeros((n, n_move), dtype=np.int64)
+    for j in range(6):
+        p, o = perm, ori
+        for k in range(3):
+            p, o = multiply(p, o, moveCube[j], corners)
+            table[:, 3 * j + k] = encode(p, o)
+    return table.tolist()
+
+
+def merge_table(n=336):
+    """MergeURtoULandUBtoDF: URtoDF of the edges of URtoUL < n and UBtoDF < n, -1 if they collide."""
+    import numpy as np
+
+    a, _ = decode('URtoUL', n)
+    b, _ = decode('UBtoDF', n)
+    a = np.repeat(a, n, axis=0)
+    b = np.tile(b, (n, 1))
+    collision = ((a[:, :8] != BR) & (b[:, :8] != BR)).any(axis=1)
+    merged = b.copy()
+    merged[:, :8] = np.where(a[:, :8] != BR, a[:, :8], b[:, :8])
+    table = np.where(collision, -1, _encode_URtoDF(merged, None))
+    return table.reshape(n, n).tolist()
@@ -0,0 +1,182 @@
+"""
+Shared-memory store for the tables of CoordCube.
+
+The parent process publishes the tables once into a multiprocessing.shared_memory segment. Worker processes attach to
+it by name and CoordCube takes its tables from the segment without copying them, so the resident memory and the start
+time of a worker do not grow with the size of the pool:
+
+    with TableStore.publish() as store:
+        pool = store.pool(8)
+        pool.map(solve, cubes)
+
+A child can also attach through the environment variable PYKOCIEMBA_TABLE_STORE, which is set to the segment name by
+init_worker and inherited by processes started afterwards.
+
+The segment starts with a header and a directory of the tables, followed by every table in the format of tablefile.
+The pruning tables are also published in the layout of coordcube.pruning_layout, if it is not the one of the table
+files, so a worker with the same layout maps them instead of decoding them.
+"""
+import logging
+import multiprocessing
+import os
+import struct
+import sys
+
+from .tablefile import as_rows, pack_table, unpack_table
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:     # python < 3.8
+    shared_memory = None
+
+log = logging.getLogger(__name__)
+
+ENV_VAR = 'PYKOCIEMBA_TABLE_STORE'
+
+STORE_MAGIC = b'PKCS'
+STORE_FORMAT_VERSION = 1
+
+TABLE_NAMES = (
+    'twistMove', 'flipMove', 'FRtoBR_Move', 'URFtoDLF_Move', 'URtoDF_Move', 'URtoUL_Move', 'UBtoDF_Move',
+    'MergeURtoULandUBtoDF', 'Slice_URFtoDLF_Parity_Prun', 'Slice_URtoDF_Parity_Prun', 'Slice_Twist_Prun',
+    'Slice_Flip_Prun',
+)
+
+_header = struct.Struct('<4sHxxI')
+_entry = struct.Struct('<32sQ')
+
+_attached = None
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+class TableStore(object):
+    """A set of tables in one shared memory segment."""
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        magic, version, count = _header.unpack_from(shm.buf, 0)
+        if magic != STORE_MAGIC or version != STORE_FORMAT_VERSION:
+            raise ValueError('%s is not a table store' % shm.name)
+        self.offsets = {}
+        for i in range(count):
+            name, offset = _entry.unpack_from(shm.buf, _header.size + i * _entry.size)
+            self.offsets[name.rstrip(b'\0').decode('ascii')] = offset
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __contains__(self, name):
+        return name in self.offsets
+
+    def unpack(self, name):
+        """(flat, rows, cols) of the table `name`, backed by the shared segment."""
+        return unpack_table(self.shm.buf, self.offsets[name])
+
+    def table(self, name):
+        """The table `name` as rows (or flat), backed by the shared segment."""
+        return as_rows(*self.unpack(name))
+
+    @classmethod
+    def publish(cls, names=TABLE_NAMES, name=None, tables=None):
+        """
+        Copy the tables of CoordCube into a new shared memory segment.
+
+        tables - {name: table} to publish instead, e.g. tables which are not installed yet; nothing of CoordCube is read
+        """
+        if shared_memory is None:
+            raise RuntimeError('multiprocessing.shared_memory requires python 3.8')
+        if tables is not None:
+            names = sorted(tables)
+            blobs = [pack_table(tables[n]) for n in names]
+        else:
+            from .coordcube import CoordCube, layout_tables
+
+            # the pruning tables in the layout of this process go along, so the workers do not decode private copies
+            views = sorted((n, t) for n, t in layout_tables().items() if n.rsplit('_', 1)[0] in names)
+            blobs = [pack_table(getattr(CoordCube, n)) for n in names] + [pack_table(t, 'B') for _, t in views]
+            names = list(names) + [n for n, _ in views]
+        offset = _align(_header.size + len(names) * _entry.size)
+        offsets = []
+        for blob in blobs:
+            offsets.append(offset)
+            offset = _align(offset + len(blob))
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=offset)
+        _header.pack_into(shm.buf, 0, STORE_MAGIC, STORE_FORMAT_VERSION, len(names))
+        for i, (n, blob, start) in enumerate(zip(names, blobs, offsets)):
+            _entry.pack_into(shm.buf, _header.size + i * _entry.size, n.encode('ascii'), start)
+            shm.buf[start:start + len(blob)] = blob
+        log.debug('published %d tables (%d bytes) as %s', len(names), offset, shm.name)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to a segment published by another process."""
+        if shared_memory is None:
+            raise RuntimeError('multiprocessing.shared_memory requires python 3.8')
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:   # python < 3.13, the resource tracker of the parent owns the segment
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm)
+
+    def install(self):
+        """
+        Make this the store CoordCube loads its tables from. If coordcube is already imported, its tables are rebound
+        to the shared ones.
+        """
+        global _attached
+        _attached = self
+        os.environ[ENV_VAR] = self.name
+        coordcube = sys.modules.get(__name__.rsplit('.', 1)[0] + '.coordcube')
+        if coordcube is not None:
+            views = set(n + suffix for n in self.offsets for suffix in coordcube.LAYOUT_SUFFIXES.values())
+            for n in self.offsets:
+                if n in views:
+                    continue    # taken by install_flat of its table
+                flat, rows, cols = self.unpack(n)
+                setattr(coordcube.CoordCube, n, as_rows(flat, rows, cols))
+                coordcube.install_flat(n, flat, rows)
+
+    def pool(self, processes=None, context=None):
+        """A multiprocessing pool whose workers use this store."""
+        ctx = context or multiprocessing
+        return ctx.Pool(processes, initializer=init_worker, initargs=(self.name,))
+
+    def close(self):
+        """Detach from the segment and remove it if it was published by this process."""
+        try:
+            self.shm.close()
+        except BufferError:
+            log.debug('%s is still referenced by loaded tables', self.name)
+        if self.owner:
+            self.shm.unlink()
+            self.owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def init_worker(name):
+    """Pool initializer: attach to the store `name` and use it for CoordCube."""
+    TableStore.attach(name).install()
+
+
+def attached():
+    """The store CoordCube should use, if any. Attaches on first use if ENV_VAR is set."""
+    global _attached
+    if _attached is None and os.environ.get(ENV_VAR) and shared_memory is not None:
+        try:
+            _attached = TableStore.attach(os.environ[ENV_VAR])
+        except (OSError, ValueError) as e:
+            log.warning('could not attach to table store %s: %s', os.environ[ENV_VAR], e)
+            del os.environ[ENV_VAR]
+    return _attached
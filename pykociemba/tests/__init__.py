@@ -0,0 +1,74 @@
+"""
+Tests of the solver. The cubes are built and the solutions checked on the cubie level, with the moves of symmetry.
+"""
+import random
+
+from ..cubiecube import CubieCube
+from ..facecube import FaceCube
+from ..symmetry import moves
+
+SOLVED = 'UUUUUUUUURRRRRRRRRFFFFFFFFFDDDDDDDDDLLLLLLLLLBBBBBBBBB'
+INVALID = 'UUUUUUUUURRRRRRRRRFFFFFFFFFDDDDDDDDDLLLLLLLLLBBBBBBBBU'
+AXES = 'URFDLB'
+
+
+def move_index(name):
+    """The move 3 * axis + power - 1 of a move name like R, U2 or F'"""
+    return 3 * AXES.index(name[0]) + ' 2\''.index(name[1:] or ' ')
+
+
+def apply(cc, maneuver):
+    """The CubieCube cc after the maneuver, a string or list of move names"""
+    if isinstance(maneuver, str):
+        maneuver = maneuver.split()
+    ret = CubieCube(cc.cp, cc.co, cc.ep, cc.eo)
+    for name in maneuver:
+        ret.multiply(moves[move_index(name)])
+    return ret
+
+
+def scramble(maneuver, cc=None):
+    """The facelet string of the cube cc, solved by default, after the maneuver"""
+    return apply(cc or CubieCube(), maneuver).toFaceCube().to_String()
+
+
+def solves(facelets, maneuver):
+    """Whether the maneuver solves the cube given by facelets"""
+    return apply(FaceCube(facelets).toCubieCube(), maneuver).toFaceCube().to_String() == SOLVED
+
+
+def parity_twin():
+    """The cube differing from the solved one only by the exchange of the corners DBL, DRB and the edges DL, DB"""
+    from ..corner import DBL, DRB
+    from ..edge import DL, DB
+
+    cc = CubieCube()
+    cc.cp[DBL], cc.cp[DRB] = DRB, DBL
+    cc.ep[DL], cc.ep[DB] = DB, DL
+    return cc
+
+
+def random_cubes(count, seed):
+    """count random cubes like tools.randomCube, drawn from a generator of their own"""
+    rng = random.Random(seed)
+    cubes = []
+    while len(cubes) < count:
+        cc = CubieCube()
+        cc.setFlip(rng.randrange(2048))
+        cc.setTwist(rng.randrange(2187))
+        cc.setURFtoDLB(rng.randrange(40320))
+        cc.setURtoBR(rng.randrange(479001600))
+        if cc.edgeParity() == cc.cornerParity():
+            cubes.append(cc.toFaceCube().to_String())
+    return cubes
+
+
+# random cubes and short scrambles the solve modes are checked on
+CUBES = random_cubes(3, 3) + [scramble("R U2 F' L D B2 R'"), scramble("F2 D' L")]
+
+
+def check(facelets, solution, maxDepth=24):
+    """Assert that the solution, a string of Search or a list of moves, solves the cube in at most maxDepth moves"""
+    moves = solution.replace('.', ' ').split() if isinstance(solution, str) else list(solution)
+    assert len(moves) <= maxDepth
+    assert solves(facelets, moves)
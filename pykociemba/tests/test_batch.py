@@ -0,0 +1,38 @@
+"""BatchSearch finds the solutions Search finds, for many cubes in lockstep."""
+import pytest
+
+from ..search import Search
+from . import CUBES, INVALID, check, scramble
+
+pytest.importorskip('numpy')
+
+from ..batch import BatchSearch  # noqa: E402
+
+# a step costs like a hundred nodes of Search, so the lockstep runs on the easy cubes
+EASY = CUBES[3:] + [scramble("D2 B' R U F2 L' D R2 B U'")]
+
+
+def test_batch():
+    results = dict(BatchSearch(size=2, tail=1).solve(EASY + [INVALID], 24))
+    assert results[len(EASY)] == 'Error 1'
+    for index, facelets in enumerate(EASY):
+        assert results[index] == Search().solution(facelets, 24, 1000, False)
+        check(facelets, results[index])
+
+
+def test_separator():
+    results = dict(BatchSearch(size=2, tail=1).solve(EASY, 24, useSeparator=True))
+    for index, facelets in enumerate(EASY):
+        assert results[index] == Search().solution(facelets, 24, 1000, True)
+
+
+def test_tail():
+    search = BatchSearch(size=4, tail=4)    # every cube is finished by Search
+    results = dict(search.solve(EASY, 24))
+    assert [results[i] for i in range(len(EASY))] == [Search().solution(f, 24, 1000, False) for f in EASY]
+    assert search.nodes > 0
+
+
+def test_max_nodes():
+    results = dict(BatchSearch(size=2, tail=1).solve(CUBES[1:3], 24, maxNodes=50))
+    assert results == {0: 'Error 8', 1: 'Error 8'}
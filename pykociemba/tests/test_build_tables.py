@@ -0,0 +1,60 @@
+"""build_tables builds, verifies and installs the tables into a directory of its own here."""
+import os
+import shutil
+
+import pytest
+
+from .. import build_tables, tablefile
+from ..tablefile import table_path
+
+
+def test_dependencies():
+    for target, (files, dependencies, _, _) in build_tables.TARGETS.items():
+        assert all(list(build_tables.TARGETS).index(dep) < list(build_tables.TARGETS).index(target)
+                   for dep in dependencies)
+    # Search builds the lastlayer tables with every table of CoordCube
+    assert set(build_tables.TARGETS['lastlayer'][1]) == set(build_tables.DEFAULT_TARGETS)
+    assert 'lastlayer' not in build_tables.DEFAULT_TARGETS
+
+
+def test_verify(tmp_path):
+    path = table_path('twistMove', str(tmp_path))
+    shutil.copy(table_path('twistMove'), path)
+    digest = build_tables.sha256(path)
+    assert build_tables.verify(path, {'twistMove.bin': digest}) is None
+    assert build_tables.verify(path, {'twistMove.bin': '0' * 64}) == 'checksum mismatch'
+    assert build_tables.verify(path, {}).startswith('no checksum')
+    assert build_tables.verify(path, None) is None      # while the checksums are recorded
+    with open(path, 'r+b') as f:
+        f.truncate(100)
+    assert build_tables.verify(path, None) is not None
+
+
+def test_checksums(tmp_path):
+    path = str(tmp_path / 'CHECKSUMS')
+    assert build_tables.read_checksums(path) == {}
+    build_tables.write_checksums({'b.bin': '1' * 64, 'a.bin': '2' * 64}, path)
+    with open(path) as f:
+        assert f.read() == '%s  a.bin\n%s  b.bin\n' % ('2' * 64, '1' * 64)
+    assert build_tables.read_checksums(path) == {'a.bin': '2' * 64, 'b.bin': '1' * 64}
+
+
+def test_build(tmp_path, monkeypatch):
+    pytest.importorskip('numpy')
+    expected = build_tables.read_checksums()
+    installed = str(tmp_path / 'prunetables')
+    os.mkdir(installed)
+    checksums = os.path.join(installed, 'CHECKSUMS')
+    monkeypatch.setattr(tablefile, 'cache_dir', installed)
+    monkeypatch.setattr(build_tables, 'cache_dir', installed)
+    monkeypatch.setattr(build_tables, 'CHECKSUMS', checksums)
+    work = str(tmp_path / 'work')
+
+    # without a checksum the built table is not installed
+    assert build_tables.build_tables(['URtoUL_Move'], 1, work) == ['URtoUL_Move']
+    assert not os.path.exists(table_path('URtoUL_Move'))
+
+    assert build_tables.build_tables(['URtoUL_Move'], 1, work, update_checksums=True) == []
+    assert build_tables.read_checksums(checksums) == {'URtoUL_Move.bin': expected['URtoUL_Move.bin']}
+    assert build_tables.build_tables(['URtoUL_Move'], 1, work) == []   # installed and verified
+    assert not os.path.exists(work)
@@ -0,0 +1,54 @@
+"""SolutionCache in memory and in a SQLite store shared by several caches."""
+import os
+
+import pytest
+
+from .. import solver
+from ..cache import SolutionCache
+from . import CUBES, check
+
+
+def test_memory():
+    cache = SolutionCache(size=2)
+    cache.put('a', 24, ['R', 'U'], 1)
+    moves, phase1 = cache.get('a', 24)
+    assert (moves, phase1) == (['R', 'U'], 1)
+    moves.append('F')       # the caller owns the list
+    assert cache.get('a', 24) == (['R', 'U'], 1)
+    assert cache.get('a', 22) is None and cache.get('a', 24, endgame=4) is None
+    cache.put('b', 24, ['F'], 1)
+    cache.put('c', 24, ['B'], 1)
+    assert cache.get('a', 24) is None     # least recently used
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_store(tmp_path):
+    path = os.path.join(str(tmp_path), 'solutions.sqlite')
+    with SolutionCache(path=path, disk_size=2) as first, SolutionCache(path=path, disk_size=2) as second:
+        first.put('a', 24, ['R'], 1)
+        second.put('b', 24, ['U'], 1)
+        assert first.get('b', 24) == (['U'], 1) and first.disk_hits == 1
+        second.put('c', 24, ['F'], 1)      # drops a, the least recently used in the store of both caches
+        assert len(first) == 2
+        assert SolutionCache(path=path).get('a', 24) is None
+
+
+def test_solve_endgame():
+    with SolutionCache() as cache:
+        facelets = CUBES[0]
+        first = solver.solve(facelets, cache=cache, endgame=4)
+        assert solver.solve(facelets, cache=cache).nodes > 0       # not the solution with the endgame
+        second = solver.solve(facelets, cache=cache, stats=True, endgame=4)
+        assert second.moves == first.moves and second.stats.cached
+        check(facelets, second.moves)
+
+
+@pytest.mark.parametrize('symmetric', [False, True])
+def test_solve_cached(symmetric):
+    with SolutionCache(symmetric=symmetric) as cache:
+        for facelets in CUBES:
+            first = solver.solve(facelets, cache=cache)
+            second = solver.solve(facelets, cache=cache)
+            assert second.moves == first.moves and second.phase1 == first.phase1
+            check(facelets, second.moves)
+        assert cache.hits == len(CUBES)
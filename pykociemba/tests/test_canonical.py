@@ -0,0 +1,45 @@
+"""The automaton accepts exactly one maneuver of every cube up to three moves from solved."""
+from .. import canonical
+from ..cubiecube import CubieCube
+from ..symmetry import moves
+from ..tablegen import PHASE2_MOVES
+
+
+def maneuvers(length, table):
+    """All maneuvers of the length accepted by the transition table, with the state after them"""
+    ret = [((), canonical.START)]
+    for _ in range(length):
+        ret = [(m + (mv,), table[18 * state + mv]) for m, state in ret for mv in range(18)
+               if table[18 * state + mv] != canonical.DEAD]
+    return ret
+
+
+def test_phase1():
+    seen = set()
+    for length, count in enumerate((1, 18, 243, 3240)):
+        found = maneuvers(length, canonical.PHASE1)
+        assert len(found) == count
+        for m, state in found:
+            assert state == canonical.state_of(m) == (m[-1] // 3 if m else canonical.START)
+            cc = CubieCube()
+            for mv in m:
+                cc.multiply(moves[mv])
+            key = (tuple(cc.cp), tuple(cc.co), tuple(cc.ep), tuple(cc.eo))
+            assert key not in seen      # no maneuver reaches a cube of a shorter or another accepted maneuver
+            seen.add(key)
+
+
+def test_phase2():
+    for state in range(canonical.N_STATE):
+        for mv in range(18):
+            allowed = canonical.PHASE2[18 * state + mv]
+            if mv not in PHASE2_MOVES:
+                assert allowed == canonical.DEAD
+            else:
+                assert allowed == canonical.PHASE1[18 * state + mv]
+        first = canonical.FIRST_AXIS[state]
+        assert any(canonical.PHASE2[18 * state + 3 * first + p] != canonical.DEAD for p in range(3))
+        assert all(canonical.PHASE1[18 * state + 3 * axis] == canonical.DEAD for axis in range(first))
+    assert canonical.state_of((0, 9, 0)) == canonical.DEAD        # U D U
+    assert canonical.state_of((9, 0)) == canonical.DEAD           # D U, the other order is searched
+    assert canonical.state_of((0, 9)) == 3
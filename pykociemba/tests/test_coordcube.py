@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from .. import coordcube
+from ..coordcube import PRUNING_NAMES, CoordCube, Mod3Table, NibbleTable, pack_mod3, unpack_pruning
+from ..search import Search
+from ..tablefile import map_table, table_path
+from . import CUBES, check
+
+MOVE_TABLES = ('twistMove', 'flipMove', 'FRtoBR_Move', 'URFtoDLF_Move', 'URtoDF_Move', 'URtoUL_Move', 'UBtoDF_Move',
+               'MergeURtoULandUBtoDF')
+
+
+@pytest.mark.parametrize('name', MOVE_TABLES)
+def test_flat_move_tables(name):
+    rows = getattr(CoordCube, name)
+    flat = getattr(CoordCube, name + 'Flat')
+    cols = len(rows[0])
+    assert len(flat) == len(rows) * cols
+    for i in range(0, len(rows), 97):
+        assert list(flat[i * cols:(i + 1) * cols]) == list(rows[i])
+
+
+def test_flat_parity_move():
+    for parity in range(2):
+        for mv in range(18):
+            assert CoordCube.parityMoveFlat[18 * parity + mv] == CoordCube.parityMove[parity][mv]
+
+
+@pytest.mark.parametrize('name', PRUNING_NAMES)
+def test_pruning_layouts(name):
+    packed = getattr(CoordCube, name)
+    byte = unpack_pruning(packed)
+    nibble = NibbleTable(packed)
+    mod3 = pack_mod3(packed)
+    assert len(byte) == len(nibble) == 2 * len(packed) and len(mod3) >= len(byte)
+    assert list(getattr(CoordCube, name + 'Table')[:1000]) == list(byte[:1000])
+    for i in range(0, len(byte), 1009):
+        assert nibble[i] == byte[i] and mod3[i] == byte[i] % 3
+
+
+@pytest.mark.parametrize('layout', ['nibble', 'mod3'])
+def test_pruning_layout(layout):
+    try:
+        coordcube.set_pruning_layout(layout)
+        assert isinstance(CoordCube.Slice_Flip_PrunTable, NibbleTable if layout == 'nibble' else Mod3Table)
+        for facelets in CUBES:
+            check(facelets, Search().solution(facelets, 24, 1000, False))
+    finally:
+        coordcube.set_pruning_layout('byte')
+    assert not isinstance(CoordCube.Slice_Flip_PrunTable, (NibbleTable, Mod3Table))
+
+
+def test_mod3_distance():
+    rng = random.Random(19)
+    byte = unpack_pruning(CoordCube.Slice_URFtoDLF_Parity_Prun)
+    mod3 = pack_mod3(CoordCube.Slice_URFtoDLF_Parity_Prun, chunk=4096)     # chunks of the table make no difference
+    assert mod3.table == pack_mod3(CoordCube.Slice_URFtoDLF_Parity_Prun).table
+    neighbours = Search._phase2Neighbours(CoordCube.URFtoDLF_MoveFlat)
+    for index in [0] + [rng.randrange(len(byte)) for _ in range(200)]:
+        assert mod3.distance(index, neighbours) == byte[index]
+
+
+def test_mod3_file():
+    try:
+        coordcube.set_pruning_layout('mod3')
+        mapped = map_table(table_path('Slice_Twist_Prun_Mod3'))[0]
+        assert CoordCube.Slice_Twist_PrunTable.table == mapped == pack_mod3(CoordCube.Slice_Twist_Prun).table
+    finally:
+        coordcube.set_pruning_layout('byte')
@@ -0,0 +1,81 @@
+import pytest
+
+from .. import endgame, solver
+from ..coordcube import CoordCube
+from ..cubiecube import CubieCube
+from ..search import Search
+from . import CUBES, apply, check, parity_twin, scramble, solves
+
+
+def test_parity_twin_is_not_solved():
+    facelets = scramble('', parity_twin())
+    search = Search()
+    search.useEndgame()
+    solution = search.solution(facelets, 24, 1000, False)
+    assert solution != ''
+    assert solves(facelets, solution)
+
+
+def test_parity_twin_near_solved():
+    facelets = scramble('R F', parity_twin())
+    solution = solver.solve(facelets, endgame=4)
+    assert solves(facelets, solution.moves)
+
+
+def test_optimal_near_solved():
+    facelets = scramble("R U2 F' L D B2")
+    search = Search()
+    search.useEndgame()
+    solution = search.solution(facelets, 24, 1000, False)
+    assert search.nodes == 0
+    assert len(solution.split()) == 6
+    assert solves(facelets, solution)
+
+
+def test_table_radius():
+    table = endgame.table(2)
+    assert len(table) == 1 + 18 + 243
+    assert table[endgame.key(*endgame.coordinates(CoordCube(CubieCube())))] == endgame.NO_MOVE
+
+
+def test_solve_does_not_keep_the_endgame():
+    facelets = scramble('R F', parity_twin())
+    solver.solve(facelets, endgame=4)
+    for solution in solver.solve_anytime(facelets, max_nodes=100000):
+        assert solves(facelets, solution.moves)
+    assert all(search.endgame is None for search in solver._idle)
+
+
+def test_projection():
+    keys = endgame.projection(2)
+    assert endgame.phase1_key(0, 0, 0) in keys
+    c = CoordCube(apply(CubieCube(), 'R F'))
+    assert endgame.phase1_key(c.twist, c.flip, c.FRtoBR // 24) in keys
+    assert len(keys) <= len(endgame.table(2))
+
+
+def test_phase1_node():
+    # 9 moves from solved: beyond the lookup before the search, phase1 reaches the radius after 3 moves
+    maneuver = "R U2 F' L D B2 R' F2 U"
+    facelets = scramble(maneuver)
+    search = Search()
+    search.useEndgame(4, 0)
+    calls = []
+    node = search.endgameNode
+
+    def endgameNode(depth, maxDepth):
+        s = node(depth, maxDepth)
+        calls.append((depth, s))
+        return s
+    search.endgameNode = endgameNode
+    solution = search.solution(facelets, 24, 1000, False)
+    assert solves(facelets, solution)
+    assert len(solution.split()) <= 9
+    assert calls and calls[-1][1] == len(solution.split()) and search.depthPhase1 == calls[-1][0]
+
+
+@pytest.mark.parametrize('facelets', CUBES)
+def test_endgame(facelets):
+    search = Search()
+    search.useEndgame()
+    check(facelets, search.solution(facelets, 24, 1000, False))
@@ -0,0 +1,38 @@
+"""Search with the flipslice-twist pruning table, built by build_tables."""
+import pytest
+
+from .. import coordcube, flipslice
+from ..search import Search
+from . import CUBES, check
+
+built = pytest.mark.skipif(flipslice.load() is None, reason='the flipslice tables are not built')
+
+
+@built
+@pytest.mark.parametrize('facelets', CUBES)
+def test_flipslice(facelets):
+    search = Search()
+    search.useFlipSliceTwist()
+    check(facelets, search.solution(facelets, 24, 1000, False))
+
+
+@built
+def test_layout():
+    byte = flipslice.load()
+    try:
+        coordcube.set_pruning_layout('nibble')
+        nibble = flipslice.load()
+        assert isinstance(nibble[3], coordcube.NibbleTable) and not isinstance(byte[3], coordcube.NibbleTable)
+        sample = range(0, len(byte[3]), 99991)
+        assert [nibble[3][i] for i in sample] == [byte[3][i] for i in sample]
+    finally:
+        coordcube.set_pruning_layout('byte')
+    assert flipslice.load() is byte
+
+
+def test_not_built(monkeypatch, tmp_path):
+    monkeypatch.setattr(flipslice, '_tables', {})
+    monkeypatch.setattr(flipslice, 'table_path', lambda name: str(tmp_path / (name + '.bin')))
+    assert flipslice.load() is None
+    with pytest.raises(IOError, match='build_tables flipslice'):
+        Search().useFlipSliceTwist()
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from .. import lastlayer, solver, tools
+from ..search import Search
+from ..symmetry import conjugate, symCube
+from . import solves
+
+built = pytest.mark.skipif(lastlayer.load() is None, reason='the lastlayer tables are not built')
+
+
+def test_rotations():
+    rotations = lastlayer.rotations()
+    assert len(rotations) == 4
+    cc = next(c for c in map(lastlayer.set_index, range(12345, lastlayer.N_INDEX)) if c is not None)
+    for idx in rotations:       # a rotation about the D axis keeps a last layer case one
+        assert lastlayer.layer_of(conjugate(cc, symCube[idx])) == lastlayer.D
+
+
+@built
+def test_stats_do_not_skip_the_table():
+    random.seed(1)
+    for _ in range(20):
+        facelets = tools.randomLastLayerCube()
+        plain = solver.solve(facelets)
+        counted = solver.solve(facelets, stats=True)
+        assert counted.moves == plain.moves
+        assert solves(facelets, counted.moves)
+        assert counted.stats.lastLayer and counted.nodes == 0
+
+
+@built
+def test_no_longer_than_search():
+    random.seed(2)
+    table = searched = 0
+    for _ in range(40):
+        facelets = tools.randomLastLayerCube()
+        moves = lastlayer.lookup(facelets)
+        assert solves(facelets, moves)
+        table += len(moves)
+        searched += len(Search().solution(facelets, 24, 1000, False).split())
+    assert table <= searched
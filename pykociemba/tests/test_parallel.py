@@ -0,0 +1,31 @@
+"""The process pools of parallel search the same maneuvers as Search."""
+from .. import canonical
+from ..parallel import OrientationRace, ParallelSearch, root_prefixes
+from ..search import Search
+from . import CUBES, INVALID, check
+
+
+def test_root_prefixes():
+    prefixes = root_prefixes(2)
+    assert len(prefixes) == len(set(prefixes)) == 18 * 15 - 27
+    for first, second in prefixes:
+        assert first // 3 != second // 3 and canonical.PHASE1[18 * canonical.state_of((first,)) + second] != canonical.DEAD
+
+
+def test_parallel_search():
+    with ParallelSearch(workers=2) as search:
+        for facelets in CUBES:
+            check(facelets, search.solution(facelets, 24, 1000, False))
+        assert search.nodes > 0
+        assert search.solution(INVALID, 24, 1000, False) == 'Error 1'
+        assert search.solution(CUBES[0], 3, 1000, False) == 'Error 7'
+
+
+def test_orientation_race():
+    with OrientationRace(workers=2) as race:
+        for facelets in CUBES:
+            check(facelets, race.solution(facelets, 24, 1000))
+        shortest = race.solution(CUBES[0], 24, 1000, shortest=True)
+        assert len(shortest.split()) <= len(Search().solution(CUBES[0], 24, 1000, False).split())
+        assert race.solution(INVALID, 24, 1000) == 'Error 1'
+    assert race.pool._state != 'RUN'
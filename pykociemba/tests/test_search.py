@@ -0,0 +1,121 @@
+import sys
+
+import pytest
+
+from .. import coordcube
+from ..search import Search, SearchStats, SearchTask
+from . import CUBES, INVALID, check, solves
+
+CUBE = 'DUUBULDBFRBFRRULLLBRDFFFBLURDBFDFDRFRULBLUFDURRBLBDUDL'
+
+
+@pytest.mark.parametrize('facelets', CUBES)
+def test_search(facelets):
+    check(facelets, Search().solution(facelets, 24, 1000, False))
+    check(facelets, Search().solution(facelets, 24, 1000, True))
+
+
+@pytest.mark.parametrize('facelets', CUBES)
+def test_search_reused(facelets):
+    search = Search()
+    first = search.solution(facelets, 24, 1000, False)
+    assert search.solution(facelets, 24, 1000, False) == first     # answered by the phase2 cache
+    check(facelets, first)
+
+
+def test_warm_cache_stats():
+    search = Search()
+    first = search.solution(CUBE, 24, 1000, False)
+    search.stats = SearchStats()
+    second = search.solution(CUBE, 24, 1000, False)
+    assert second == first
+    assert solves(CUBE, second)
+    assert search.stats.cacheHits > 0
+    assert search.stats.cacheEntries == len(search.phase2Cache) > 0
+    assert search.stats.cacheBytes > 0
+
+
+def test_anytime():
+    search = Search()
+    found = list(search.solutions(CUBE, 24, 1000, True, 300000))
+    assert found[0] == Search().solution(CUBE, 24, 1000, True)
+    lengths = [len(s.replace('. ', '').split()) for s in found]
+    assert lengths == sorted(set(lengths), reverse=True)
+    for s in found:
+        assert solves(CUBE, s.replace('. ', ''))
+    assert list(Search().solutions(CUBE, 3, 1000, False)) == ['Error 7']
+    assert list(Search().solutions(INVALID, 24, 1000, False)) == ['Error 1']
+
+
+def lookups(search):
+    search.stats = SearchStats()
+    search.solution(CUBE, 24, 1000, False)
+    stats = search.stats
+    return stats, sum(stats.phase1Nodes.values()), 2 * stats.phase2Nodes + 2 * stats.totalDepthCalls - stats.d1Rejections
+
+
+def test_pruning_lookups():
+    stats, phase1, phase2 = lookups(Search())
+    assert stats.pruningLookups == 2 * phase1 + phase2
+    try:
+        coordcube.set_pruning_layout('mod3')
+        stats, phase1, phase2 = lookups(Search())
+        assert stats.pruningLookups > 2 * phase1 + 2 * stats.phase2Nodes     # and the walks to the exact distances
+    finally:
+        coordcube.set_pruning_layout('byte')
+    search = Search()
+    search.useFlipSliceTwist()
+    stats, phase1, phase2 = lookups(search)
+    assert stats.pruningLookups == phase1 + phase2
+
+
+def test_incremental_phase2():
+    from ..coordcube import CoordCube
+
+    search = Search()
+    search.phase2CacheSize = 0      # every phase2 start replays the coordinates
+    for facelets in CUBES:
+        s = search.solution(facelets, 24, 1000, False)
+        assert s == Search().solution(facelets, 24, 1000, False)
+        d = search.depthPhase1
+        coords = [search.URFtoDLF[0], search.FRtoBR[0], search.parity[0], search.URtoUL[0], search.UBtoDF[0]]
+        for i in range(d):
+            mv = 3 * search.ax[i] + search.po[i] - 1
+            coords = [CoordCube.URFtoDLF_MoveFlat[18 * coords[0] + mv], CoordCube.FRtoBR_MoveFlat[18 * coords[1] + mv],
+                      CoordCube.parityMoveFlat[18 * coords[2] + mv], CoordCube.URtoUL_MoveFlat[18 * coords[3] + mv],
+                      CoordCube.UBtoDF_MoveFlat[18 * coords[4] + mv]]
+        assert coords == [search.URFtoDLF[d], search.FRtoBR[d], search.parity[d], search.URtoUL[d], search.UBtoDF[d]]
+
+
+def test_search_task():
+    task = SearchTask(Search(), CUBES[0], quantum=100)
+    while not task.step():
+        pass
+    check(CUBES[0], task.result)
+
+
+def test_search_task_cancel():
+    task = SearchTask(Search(), CUBES[0], quantum=100)
+    task.step()
+    task.cancel()
+    while not task.step():
+        pass
+    assert task.result == 'Error 9'
+
+
+@pytest.mark.parametrize('maxNodes', [2000, 5000, 20000])
+def test_node_budget(maxNodes):
+    # phase2 checks the budget every 1024 nodes, phase1 at every wrap of its axis
+    search = Search()
+    search.prepare(CUBES[2])
+    assert search.search(24, 1000, maxNodes=maxNodes) == -8
+    assert maxNodes < search.nodes < maxNodes + 1024 + 100
+
+
+def test_cancel_in_phase2():
+    search = Search()
+    search.prepare(CUBES[2])
+
+    def cancelled():
+        return sys._getframe(2).f_code.co_name == 'totalDepth'     # polled by the phase2 search
+    assert search.search(24, 1000, cancelled=cancelled) == -9
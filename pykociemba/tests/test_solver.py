@@ -0,0 +1,74 @@
+"""The solver API: solve, solve_anytime, solve_async and solve_many return maneuvers which solve the cube."""
+import asyncio
+import pickle
+
+import pytest
+
+from .. import solver
+from . import CUBES, INVALID, check, scramble
+
+
+@pytest.mark.parametrize('facelets', CUBES)
+def test_solve(facelets):
+    check(facelets, solver.solve(facelets).moves)
+    check(facelets, solver.solve(facelets, stats=True).moves)
+    check(facelets, solver.solve(facelets, endgame=4).moves)
+    check(facelets, solver.solve(facelets, max_depth=22).moves, 22)
+
+
+def test_solution():
+    facelets = scramble("R U2 F' L D B2 R'")
+    sol = solver.solve(facelets)
+    assert sol.phase1 + sol.phase2 == len(sol) == len(sol.moves)
+    assert str(sol) == ' '.join(sol.moves)
+    assert sol.nodes > 0 and sol.elapsed >= 0
+
+
+def test_pool():
+    solver.warm_up(2)
+    assert len(solver._idle) >= 2
+    search = solver._idle[-1]
+    solver.solve(CUBES[0])
+    assert solver._idle[-1] is search     # the same Search is handed out again and returned to the pool
+
+
+def test_solve_error():
+    with pytest.raises(solver.SolveError) as e:
+        solver.solve(INVALID)
+    assert e.value.code == 1 and str(e.value).startswith('Error 1: ')
+    with pytest.raises(solver.SolveError) as e:
+        solver.solve(CUBES[0], max_depth=3)
+    assert e.value.code == 7
+    assert pickle.loads(pickle.dumps(e.value)).code == 7
+
+
+@pytest.mark.parametrize('facelets', CUBES)
+def test_solve_anytime(facelets):
+    lengths = []
+    for solution in solver.solve_anytime(facelets, max_nodes=500000):
+        check(facelets, solution.moves)
+        lengths.append(len(solution))
+    assert lengths and lengths == sorted(set(lengths), reverse=True)
+
+
+def test_solve_async():
+    async def main():
+        return await asyncio.gather(*(solver.solve_async(f, max_nodes=10 ** 7, quantum=1000) for f in CUBES))
+
+    for facelets, solution in zip(CUBES, asyncio.run(main())):
+        check(facelets, solution.moves)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_solve_many(workers):
+    results = dict(solver.solve_many(CUBES + [INVALID], workers=workers, chunk=2))
+    for index, facelets in enumerate(CUBES):
+        check(facelets, results[index].moves)
+    assert isinstance(results[len(CUBES)], solver.SolveError)
+
+
+def test_solve_many_unordered():
+    results = list(solver.solve_many(CUBES[3:], workers=2, chunk=1, ordered=False))
+    assert sorted(index for index, _ in results) == list(range(len(CUBES[3:])))
+    for index, solution in results:
+        check(CUBES[3 + index], solution.moves)
@@ -0,0 +1,56 @@
+import array
+import os
+import pickle
+
+import pytest
+
+from .. import tablefile
+
+
+def test_round_trip(tmp_path):
+    rows = [[i * 18 + j - 100 for j in range(18)] for i in range(20)]
+    path = str(tmp_path / 'rows.bin')
+    tablefile.write_table(rows, path)
+    flat, n, cols = tablefile.map_table(path)
+    assert (n, cols) == (20, 18)
+    assert flat.format == 'h'
+    assert [list(row) for row in tablefile.read_table(path)] == rows
+
+
+def test_flat_round_trip(tmp_path):
+    table = bytearray(range(256)) * 3
+    path = str(tmp_path / 'flat.bin')
+    tablefile.write_table(table, path, 'B')
+    flat, rows, cols = tablefile.map_table(path)
+    assert (rows, cols) == (0, len(table))
+    assert bytes(flat) == bytes(table)
+
+
+@pytest.mark.parametrize('entries, typecode', [
+    ([0, 255], 'B'), ([-1, 127], 'b'), ([0, 65535], 'H'), ([-1, 32767], 'h'), ([0, 0xffffffff], 'I'),
+    ([-1, 1 << 20], 'i'),
+])
+def test_typecode(entries, typecode):
+    assert tablefile.typecode_for(entries) == typecode
+    flat, _, _ = tablefile.unpack_table(tablefile.pack_table(entries))
+    assert list(flat) == entries
+
+
+def test_invalid():
+    data = tablefile.pack_table(list(range(100)))
+    with pytest.raises(ValueError):
+        tablefile.unpack_table(b'XXXX' + data[4:])
+    with pytest.raises(ValueError):
+        tablefile.unpack_table(data[:-1])
+
+
+def test_shipped_tables_match_pickles():
+    for filename in sorted(os.listdir(tablefile.cache_dir)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.pkl' or not os.path.exists(tablefile.table_path(name)):
+            continue
+        with open(os.path.join(tablefile.cache_dir, filename), 'rb') as f:
+            table = pickle.load(f)
+        flat, _, _ = tablefile.map_table(tablefile.table_path(name))
+        _, _, entries = tablefile.flatten(table)
+        assert array.array(flat.format, flat) == array.array(flat.format, entries), name
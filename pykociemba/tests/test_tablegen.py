@@ -0,0 +1,54 @@
+"""The tables of tablegen against the pickles of prunetables/, which were built by the loops of coordcube."""
+import os
+import pickle
+
+import pytest
+
+from ..tablefile import cache_dir
+
+pytest.importorskip('numpy')
+
+from .. import tablegen  # noqa: E402
+
+
+def reference(name):
+    with open(os.path.join(cache_dir, name + '.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+
+@pytest.mark.parametrize('name, coord, n', [
+    ('twistMove', 'twist', 2187), ('flipMove', 'flip', 2048), ('URtoUL_Move', 'URtoUL', 1320),
+    ('UBtoDF_Move', 'UBtoDF', 1320),
+])
+def test_small_move_tables(name, coord, n):
+    assert tablegen.move_table(coord, n) == [list(row) for row in reference(name)]
+
+
+@pytest.mark.parametrize('name, coordMove, n', [('Slice_Twist_Prun', 'twistMove', 2187),
+                                                ('Slice_Flip_Prun', 'flipMove', 2048)])
+def test_phase1_pruning(name, coordMove, n):
+    table = tablegen.phase1_pruning(reference(coordMove), reference('FRtoBR_Move'), n)
+    assert bytes(table) == bytes(bytearray(reference(name)))
+
+
+def test_phase2_pruning():
+    table = tablegen.phase2_pruning(reference('URFtoDLF_Move'), reference('FRtoBR_Move'), tablegen.PARITY_MOVE, 20160)
+    assert bytes(table) == bytes(bytearray(reference('Slice_URFtoDLF_Parity_Prun')))
+
+
+@pytest.mark.parametrize('name, coord, n', [
+    ('FRtoBR_Move', 'FRtoBR', 11880), ('URFtoDLF_Move', 'URFtoDLF', 20160), ('URtoDF_Move', 'URtoDF', 20160),
+])
+def test_move_tables(name, coord, n):
+    assert tablegen.move_table(coord, n) == [list(row) for row in reference(name)]
+
+
+def test_merge_table():
+    assert tablegen.merge_table(336) == [list(row) for row in reference('MergeURtoULandUBtoDF')]
+
+
+@pytest.mark.parametrize('coord', sorted(tablegen.COORDINATES))
+def test_encode_decode(coord):
+    encode = tablegen.COORDINATES[coord][2]
+    perm, ori = tablegen.decode(coord, 1000)
+    assert encode(perm, ori).tolist() == list(range(1000))
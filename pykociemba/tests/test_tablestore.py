@@ -0,0 +1,53 @@
+import pytest
+
+from .. import coordcube, tablestore
+from ..coordcube import CoordCube
+from ..search import Search
+
+pytestmark = pytest.mark.skipif(tablestore.shared_memory is None, reason='needs multiprocessing.shared_memory')
+
+CUBE = 'DUUBULDBFRBFRRULLLBRDFFFBLURDBFDFDRFRULBLUFDURRBLBDUDL'
+
+
+def _worker(_):
+    store = tablestore.attached()
+    tables = [getattr(CoordCube, name + 'Table') for name in coordcube.PRUNING_NAMES]
+    shared = [getattr(t, 'table', t).obj is store.shm.buf.obj for t in tables]
+    shared.append(CoordCube.twistMoveFlat.obj is store.shm.buf.obj)
+    return shared, Search().solution(CUBE, 24, 1000, False)
+
+
+def _published(store, name):
+    flat, rows, _ = store.unpack(name)
+    return rows, list(flat)
+
+
+def test_publish():
+    with tablestore.TableStore.publish() as store:
+        for name in tablestore.TABLE_NAMES:
+            rows, entries = _published(store, name)
+            assert entries == list(getattr(CoordCube, name + ('Flat' if rows else '')))
+        for name, table in coordcube.layout_tables().items():
+            assert _published(store, name)[1] == list(table)
+
+
+def test_workers_share_the_tables():
+    expected = Search().solution(CUBE, 24, 1000, False)
+    with tablestore.TableStore.publish() as store:
+        pool = store.pool(2)
+        try:
+            results = pool.map(_worker, range(2))
+        finally:
+            pool.terminate()
+            pool.join()
+    for shared, solution in results:
+        assert solution == expected
+        assert all(shared)
+
+
+def test_publish_tables():
+    tables = {'twistMove': CoordCube.twistMove, 'Slice_Flip_Prun': CoordCube.Slice_Flip_Prun}
+    with tablestore.TableStore.publish(tables=tables) as store:
+        assert sorted(store.offsets) == sorted(tables)
+        assert _published(store, 'twistMove')[1] == list(CoordCube.twistMoveFlat)
+        assert _published(store, 'Slice_Flip_Prun')[1] == list(CoordCube.Slice_Flip_Prun)
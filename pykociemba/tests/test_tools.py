@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+from .. import tools
+from ..cubiecube import CubieCube
+from ..edge import UR, UF
+from . import SOLVED, scramble
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_verify():
+    assert tools.verify(SOLVED) == 0
+    assert tools.verify(scramble("R U F' D2")) == 0
+    assert tools.verify(SOLVED[:-1] + 'U') == -1
+    cc = CubieCube()
+    cc.ep[UR], cc.ep[UF] = UF, UR
+    assert tools.verify(cc.toFaceCube().to_String()) == -6
+
+
+def test_verify_does_not_load_the_tables():
+    code = ('import sys; from pykociemba import tools; tools.verify(%r); '
+            'sys.exit("pykociemba.coordcube" in sys.modules)' % SOLVED)
+    assert subprocess.call([sys.executable, '-c', code], cwd=ROOT) == 0
@@ -3,13 +3,13 @@ from builtins import range
 
 from .facecube import FaceCube
 from .cubiecube import CubieCube
-from .coordcube import CoordCube
 from .color import colors
 
 
 def verify(s):
     """
-    Check if the cube definition string s represents a solvable cube.
+    Check if the cube definition string s represents a solvable cube. Only the facelet and cubie levels are needed,
+    so this does not load the move and pruning tables of CoordCube.
 
     @param s is the cube definition string , see {@link Facelet}
     @return 0: Cube is solvable<br>
@@ -43,6 +43,8 @@ def randomCube():
     Generates a random cube.
     @return A random cube in the string representation. Each cube of the cube space has the same probability.
     """
+    from .coordcube import CoordCube
+
     cc = CubieCube()
     cc.setFlip(random.randint(0, CoordCube.N_FLIP - 1))
     cc.setTwist(random.randint(0, CoordCube.N_TWIST - 1))
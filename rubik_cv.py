@@ -6,11 +6,11 @@
 __author__ = "Lucas Bulloni, Malik Fleury, Bastien Wermeille"
 __version__ = "1.0.0"
 
-import kociemba
 import numpy as np
 import cv2 as cv
 import sys
 
+import pykociemba
 from detect_color import detect_color
 from reconstruct import reconstruct
 from face_detection import detect_rubik
@@ -94,7 +94,7 @@ def rubik_cv():
     print(faces)
     cube = reconstruct(faces)
     print(cube)
-    solution = kociemba.solve(cube)
+    solution = str(pykociemba.solve(cube))
     print(solution)
 
     gl_app = OpenGLApp(solution)